@@ -5,6 +5,7 @@
 import streamlit as st
 import html
 import pandas as pd
+import numpy as np
 import random
 import streamlit.components.v1 as components
 import altair as alt
@@ -12,18 +13,25 @@ from bs4 import BeautifulSoup
 import os
 from dotenv import load_dotenv
 from supabase import create_client
+from postgrest.exceptions import APIError
 import os
-
-
-# Carica le variabili da secrets di streamlite
-SUPABASE_URL = st.secrets["SUPABASE_URL"]
-SUPABASE_KEY = st.secrets["SUPABASE_KEY"]
-
-from supabase import create_client
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-# --- Configurazione pagina ---
-st.set_page_config(layout="wide")
+import functools
+import json
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, deque
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# Con "streamlit run" il modulo è __main__: importato (benchmark, script) non si collega a
+# Supabase e non disegna nulla, espone solo le funzioni (vedi "Avvio dell'app" in fondo)
+AVVIO_APP = __name__ == "__main__"
+
+supabase = None  # client creato all'avvio dell'app con i secrets di streamlit
 oggi = pd.Timestamp.today().normalize()
 
 # --- Giorni festivi ---
@@ -39,32 +47,801 @@ giorni_festivi = {
     pd.Timestamp("2025-12-26"),
 }
 
+# --- Orizzonte delle date ---
+TURNI = ['M', 'P', 'N']
+FINESTRA_GIORNI_PRIMA = 10  # finestra iniziale delle tabelle attorno ad oggi
+FINESTRA_GIORNI_DOPO = 30
+
+def finestra_iniziale(oggi):
+    return oggi - pd.Timedelta(days=FINESTRA_GIORNI_PRIMA), oggi + pd.Timedelta(days=FINESTRA_GIORNI_DOPO)
+
+def limiti_pivot(pivot, oggi):
+    """Primo e ultimo giorno occupato del pivot, allargati alla finestra iniziale."""
+    inizio, fine = finestra_iniziale(oggi)
+    giorni = pivot.columns.get_level_values(0) if isinstance(pivot.columns, pd.MultiIndex) else pivot.columns
+    if len(giorni):
+        inizio, fine = min(inizio, giorni.min()), max(fine, giorni.max())
+    return inizio, fine
+
+def espandi_colonne(pivot, inizio, fine):
+    """
+    Riempie i giorni vuoti tra inizio e fine (x TURNI per i pivot data/turno):
+    i pivot restano sparsi e la griglia completa esiste solo per la parte visibile.
+    """
+    giorni = pd.date_range(inizio, fine, freq='D')
+    if isinstance(pivot.columns, pd.MultiIndex):
+        colonne = pd.MultiIndex.from_product([giorni, TURNI], names=pivot.columns.names)
+    else:
+        colonne = giorni
+    return pivot.reindex(columns=colonne, fill_value='')
+
+# --- Profilo delle fasi (opzionale: GANTT_PROFILO=1 oppure ?profilo=1 nell'URL) ---
+PROFILO_ATTIVO = False  # deciso ad ogni rerun all'avvio dell'app; spento, costa un solo controllo
+PROFILO_MAX_MISURE = 1000  # per chiave: i sync in background registrano anche se nessuno raccoglie
+log_profilo = logging.getLogger("gantt.profilo")
+if not log_profilo.handlers:
+    log_profilo.addHandler(logging.StreamHandler())
+    log_profilo.setLevel(logging.INFO)
+    log_profilo.propagate = False
+
+@st.cache_resource
+def registro_profilo():
+    # misure non ancora mostrate, per sessione ("background" = thread di sincronizzazione)
+    return {"misure": {}, "lock": threading.Lock()}
+
+def chiave_profilo():
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx else "background"
+
+def profila(funzione):
+    """Decoratore: con il profilo attivo registra tempo, righe in ingresso/uscita e caratteri prodotti."""
+    @functools.wraps(funzione)
+    def misurata(*args, **kwargs):
+        if not PROFILO_ATTIVO:
+            return funzione(*args, **kwargs)
+        inizio = time.perf_counter()
+        risultato = funzione(*args, **kwargs)
+        misura = {
+            "fase": funzione.__name__,
+            "secondi": time.perf_counter() - inizio,
+            "righe_in": next((len(a) for a in (*args, *kwargs.values()) if isinstance(a, pd.DataFrame)), None),
+            "righe_out": len(risultato) if isinstance(risultato, (pd.DataFrame, dict)) else None,
+            "caratteri": len(risultato) if isinstance(risultato, str) else None,
+        }
+        registro = registro_profilo()
+        with registro["lock"]:
+            registro["misure"].setdefault(chiave_profilo(), deque(maxlen=PROFILO_MAX_MISURE)).append(misura)
+        return risultato
+    return misurata
+
+def raccogli_profilo():
+    """Misure della sessione (anche del rerun precedente, es. "Aggiorna dati") e dei sync in background."""
+    registro = registro_profilo()
+    with registro["lock"]:
+        return [*registro["misure"].pop(chiave_profilo(), []), *registro["misure"].pop("background", [])]
+
+def riepilogo_profilo(misure):
+    colonne = ["fase", "secondi", "righe_in", "righe_out", "caratteri"]
+    tabella = pd.DataFrame(misure, columns=colonne)
+    return (
+        tabella.groupby("fase", sort=False)
+               .agg(chiamate=("secondi", "size"), secondi=("secondi", "sum"),
+                    righe_in=("righe_in", lambda x: x.sum(min_count=1)),
+                    righe_out=("righe_out", lambda x: x.sum(min_count=1)),
+                    caratteri=("caratteri", lambda x: x.sum(min_count=1)))
+               .astype({"righe_in": "Int64", "righe_out": "Int64", "caratteri": "Int64"})
+               .sort_values("secondi", ascending=False)
+    )
+
 # --- Caricamento dati da Supabase ---
 
-@st.cache_data
-def load_data():
-    limit = 1000
-    offset = 0
-    rows = []
+def leggi_config(nome, default):
+    """
+    Legge un parametro da st.secrets (o, in alternativa, dalle variabili d'ambiente)
+    convertendolo nel tipo del valore di default.
+    """
+    try:
+        valore = st.secrets.get(nome)
+    except Exception:
+        valore = None
+    if valore is None:
+        valore = os.environ.get(nome)
+    if valore is None:
+        return default
+    if isinstance(default, bool):
+        return str(valore).strip().lower() in ("1", "true", "si", "sì", "yes")
+    if isinstance(default, int):
+        return int(valore)
+    return valore
+
+TABELLA_RUN = "tbl_run_progetti"
+FETCH_MODE = leggi_config("SUPABASE_FETCH_MODE", "parallelo")  # "parallelo" oppure "sequenziale"
+PAGE_SIZE = leggi_config("SUPABASE_PAGE_SIZE", 1000)  # non oltre il max-rows del server (1000 su Supabase)
+MAX_WORKERS = leggi_config("SUPABASE_MAX_WORKERS", 8)
+CODICE_COLONNA_MANCANTE = "42703"  # undefined_column di PostgreSQL, riportato da PostgREST
+
+# Colonne di sincronizzazione: se la tabella non le ha vengono disattivate all'avvio
+# (vedi configura_sync) e ogni aggiornamento ricarica tutta la tabella
+SYNC_ID_COL = leggi_config("SUPABASE_SYNC_ID_COL", "id")  # chiave primaria della run ("" = disattiva)
+SYNC_TS_COL = leggi_config("SUPABASE_SYNC_TS_COL", "updated_at")  # timestamp di ultima modifica ("" = disattiva)
+SYNC_IDS_PER_RICHIESTA = 200  # id per filtro in.(...) quando si recuperano run mancanti (lunghezza URL)
+
+# Schema delle colonne lette dall'app: guida sia la select proiettata sia la conversione dei tipi.
+#   "testo"  -> stringa ripulita con .astype(str).str.strip()
+#   "data"   -> datetime (valori non validi -> NaT)
+#   "grezzo" -> valore così come arriva (None dove manca)
+SCHEMA_BASE = {
+    "ID_Progetto": "testo",
+    "Scenario": "testo",
+    "Stato": "testo",
+    "Pista": "testo",
+    "TE": "grezzo",
+    "AL": "grezzo",
+    "Piattaforma": "grezzo",
+    "Turno": "grezzo",
+    "Data_svolgimento": "data",
+}
 
+def schema_run():
+    """SCHEMA_BASE più le colonne di sincronizzazione attive."""
+    schema = dict(SCHEMA_BASE)
+    for col in (SYNC_ID_COL, SYNC_TS_COL):
+        if col:
+            schema[col] = "grezzo"
+    return schema
+
+SCHEMA_RUN = schema_run()
+COLONNE_RUN = list(SCHEMA_RUN)
+SELECT_RUN = ",".join(COLONNE_RUN)
+# Colonne ripetute (poche decine/centinaia di valori distinti su migliaia di righe) tenute in
+# memoria come Categorical: un codice intero per riga e le stringhe una volta sola. Le categorie
+# sono in ordine lessicale, così ordinamenti e groupby sui codici danno lo stesso ordine delle stringhe.
+COLONNE_CATEGORICHE = ["ID_Progetto", "Scenario", "Stato", "Pista", "TE", "AL", "Piattaforma", "Turno"]
+
+@st.cache_resource
+def client_supabase(url, key):
+    # un solo client per processo, condiviso da sessioni, rerun e refresher
+    return create_client(url, key)
+
+@st.cache_resource
+def colonne_sync_presenti(url, colonne):
+    """
+    Colonne di sincronizzazione che esistono davvero in TABELLA_RUN, verificate una volta
+    per processo: PostgREST rifiuta l'intera select se ne chiede una che non esiste.
+    """
+    presenti = []
+    for col in colonne:
+        try:
+            supabase.table(TABELLA_RUN).select(col).limit(1).execute()
+        except APIError as e:
+            if e.code != CODICE_COLONNA_MANCANTE:
+                raise
+            continue
+        presenti.append(col)
+    return presenti
+
+def configura_sync(presenti):
+    """Disattiva le colonne di sincronizzazione assenti e ricalcola schema e select."""
+    global SYNC_ID_COL, SYNC_TS_COL, SCHEMA_RUN, COLONNE_RUN, SELECT_RUN
+    SYNC_ID_COL = SYNC_ID_COL if SYNC_ID_COL in presenti else ""
+    SYNC_TS_COL = SYNC_TS_COL if SYNC_TS_COL in presenti else ""
+    SCHEMA_RUN = schema_run()
+    COLONNE_RUN = list(SCHEMA_RUN)
+    SELECT_RUN = ",".join(COLONNE_RUN)
+
+def scarica_pagina(offset, limit, colonne=None, filtro=None):
+    query = supabase.table(TABELLA_RUN).select(colonne or SELECT_RUN)
+    if filtro is not None:
+        query = filtro(query)
+    if SYNC_ID_COL:
+        # senza un ordine totale richieste separate possono vedere le righe in ordini diversi
+        query = query.order(SYNC_ID_COL)
+    result = query.range(offset, offset + limit - 1).execute()
+    return result.data or []
+
+def scarica_sequenziale(limit=PAGE_SIZE, colonne=None, offset=0, filtro=None):
+    rows = []
     while True:
-        result = supabase.table("tbl_run_progetti").select("*").range(offset, offset + limit - 1).execute()
-        if not result.data:
+        pagina = scarica_pagina(offset, limit, colonne, filtro)
+        if not pagina:
             break
-        rows.extend(result.data)
-        offset += limit
+        rows.extend(pagina)
+        # avanzo delle righe ricevute: il server può tagliare la pagina sotto `limit`
+        offset += len(pagina)
+    return rows
 
+def scarica_per_id(ids, colonne=None):
+    # run con gli id indicati, a blocchi di SYNC_IDS_PER_RICHIESTA per non superare i limiti dell'URL
+    rows = []
+    for k in range(0, len(ids), SYNC_IDS_PER_RICHIESTA):
+        blocco = ids[k:k + SYNC_IDS_PER_RICHIESTA]
+        rows.extend(scarica_sequenziale(colonne=colonne, filtro=lambda q: q.in_(SYNC_ID_COL, blocco)))
+    return rows
+
+def conta_righe(filtro=None):
+    query = supabase.table(TABELLA_RUN).select("*", count="exact", head=True)
+    if filtro is not None:
+        query = filtro(query)
+    return query.execute().count or 0
+
+def scarica_parallelo(limit=PAGE_SIZE, max_workers=MAX_WORKERS, colonne=None, filtro=None):
+    """
+    Chiede prima il numero esatto di righe e poi scarica le pagine in parallelo
+    con un pool di thread limitato. Le pagine vengono ricomposte nell'ordine
+    degli offset, indipendentemente dall'ordine di arrivo.
+    """
+    totale = conta_righe(filtro)
+    offsets = list(range(0, totale, limit))
+    if not offsets:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(offsets)))) as pool:
+        pagine = list(pool.map(lambda off: scarica_pagina(off, limit, colonne, filtro), offsets))
+
+    # una pagina (anche l'ultima o l'unica) più corta di quanto il conteggio prevede vuol
+    # dire che il server taglia a meno di `limit` righe, o che delle righe sono sparite
+    # durante il download: meglio ripiegare sul ciclo sequenziale che perdere dati
+    if any(len(p) < min(limit, totale - off) for p, off in zip(pagine, offsets)):
+        return scarica_sequenziale(limit, colonne, filtro=filtro)
+
+    rows = [r for p in pagine for r in p]
+    # righe inserite tra il conteggio e il download: le recupero in coda
+    if len(pagine[-1]) == limit:
+        rows.extend(scarica_sequenziale(limit, colonne, offset=offsets[-1] + limit, filtro=filtro))
+    return rows
+
+def crea_frame(rows):
+    """
+    Costruisce il DataFrame delle run controllando che le colonne ricevute
+    corrispondano esattamente a SCHEMA_RUN: colonne mancanti o sconosciute
+    sono un errore, non vengono aggiunte o ignorate in silenzio.
+    """
+    if not rows:
+        return pd.DataFrame(columns=COLONNE_RUN)
     df = pd.DataFrame(rows)
+    mancanti = [c for c in COLONNE_RUN if c not in df.columns]
+    sconosciute = [c for c in df.columns if c not in SCHEMA_RUN]
+    if mancanti or sconosciute:
+        raise ValueError(
+            f"Schema di {TABELLA_RUN} non valido: colonne mancanti {mancanti}, "
+            f"colonne sconosciute {sconosciute}"
+        )
+    return df[COLONNE_RUN]
 
-    # parsing e pulizia come prima
-    df['Data_svolgimento'] = pd.to_datetime(df['Data_svolgimento'], errors='coerce')
-    df['Scenario'] = df['Scenario'].astype(str).str.strip()
-    df['Stato'] = df['Stato'].astype(str).str.strip()
-    df['ID_Progetto'] = df['ID_Progetto'].astype(str).str.strip()
-    df['Pista'] = df['Pista'].astype(str).str.strip()
+def categorica(serie, testo=False):
+    """
+    Serie come Categorical con categorie in ordine lessicale. Con testo=True i valori sono
+    ripuliti come le colonne "testo" (.astype(str).str.strip(), nulli compresi), ma la
+    conversione lavora sui soli valori distinti.
+    """
+    if testo:
+        nulli = serie.isna()
+        if nulli.any():
+            # None e NaN diventano 'None' e 'nan', come con astype(str)
+            serie = serie.where(~nulli, serie[nulli].astype(str))
+    codici, valori = pd.factorize(serie)
+    valori = pd.Index(valori, dtype=object)
+    if testo:
+        valori = valori.astype(str).str.strip()
+    categorie = valori.unique().sort_values()
+    # il -1 in coda rimappa i nulli (codice -1) su se stessi
+    codici = np.append(categorie.get_indexer(valori), -1)[codici]
+    return pd.Series(pd.Categorical.from_codes(codici, categories=categorie), index=serie.index, name=serie.name)
+
+def riempi(serie, valore):
+    """fillna che funziona anche sulle colonne categoriche (aggiunge `valore` alle categorie)."""
+    if isinstance(serie.dtype, pd.CategoricalDtype) and valore not in serie.cat.categories:
+        serie = serie.cat.set_categories(serie.cat.categories.append(pd.Index([valore])).sort_values())
+    return serie.fillna(valore)
+
+def stringhe(serie, vuoto=""):
+    """
+    Valori come stringhe ripulite (`vuoto` per i nulli). Una categorica resta categorica
+    (categorie ripulite, in ordine lessicale) e la pulizia lavora sulle sole categorie.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        valori = pd.Index(np.append(serie.cat.categories.astype(str).str.strip(), vuoto), dtype=object)
+        categorie = valori.unique().sort_values()
+        # il codice -1 dei nulli prende l'ultimo valore, cioè `vuoto`
+        codici = categorie.get_indexer(valori)[serie.cat.codes.to_numpy()]
+        return pd.Categorical.from_codes(codici, categories=categorie)
+    return np.where(serie.notna(), serie.astype(str).str.strip(), vuoto)
+
+VALORI_VUOTI = ("", "nan", "None")  # nulli diventati testo in pulisci_dati
+
+def pulisci_dati(df):
+    # parsing e pulizia guidati dallo schema
+    for col, tipo in SCHEMA_RUN.items():
+        if tipo == "data":
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        elif col in COLONNE_CATEGORICHE:
+            df[col] = categorica(df[col], testo=tipo == "testo")
+        elif tipo == "testo":
+            df[col] = df[col].astype(str).str.strip()
     return df
 
-df = load_data()
+@profila
+def load_data(modalita=FETCH_MODE, limit=PAGE_SIZE, max_workers=MAX_WORKERS, filtro=None):
+    if modalita == "parallelo":
+        rows = scarica_parallelo(limit, max_workers, filtro=filtro)
+    else:
+        rows = scarica_sequenziale(limit, filtro=filtro)
+
+    df = pulisci_dati(crea_frame(rows))
+    # ordine stabile per id: un caricamento completo e uno incrementale danno lo stesso frame
+    if SYNC_ID_COL in df.columns:
+        df = df.sort_values(SYNC_ID_COL, kind='stable', ignore_index=True)
+    return df
+
+# --- Snapshot locale (Parquet) per gli avvii a caldo ---
+
+SNAPSHOT_PATH = leggi_config("GANTT_SNAPSHOT_PATH", os.path.join("cache", "tbl_run_progetti.parquet"))
+# da incrementare quando cambia il modo in cui il frame viene pulito/salvato
+SNAPSHOT_VERSIONE = 2  # 2: colonne COLONNE_CATEGORICHE salvate come dizionari
+SNAPSHOT_CHIAVE_META = b"gantt_snapshot"
+
+def firma_schema():
+    return json.dumps(SCHEMA_RUN, sort_keys=True)
+
+def salva_snapshot(df, hwm):
+    """
+    Scrive il DataFrame pulito in Parquet con versione, schema e high-water mark
+    nei metadati. La scrittura passa da un file temporaneo rinominato, così un
+    lettore concorrente vede sempre uno snapshot completo.
+    """
+    meta = {
+        "versione": SNAPSHOT_VERSIONE,
+        "schema": firma_schema(),
+        "hwm": hwm,
+        "salvato": pd.Timestamp.now(tz="UTC").isoformat(),
+        "righe": len(df),
+    }
+    tabella = pa.Table.from_pandas(df, preserve_index=False)
+    tabella = tabella.replace_schema_metadata({
+        **(tabella.schema.metadata or {}),
+        SNAPSHOT_CHIAVE_META: json.dumps(meta).encode(),
+    })
+    os.makedirs(os.path.dirname(SNAPSHOT_PATH) or ".", exist_ok=True)
+    tmp = SNAPSHOT_PATH + ".tmp"
+    pq.write_table(tabella, tmp)
+    os.replace(tmp, SNAPSHOT_PATH)
+
+def leggi_snapshot():
+    """
+    Restituisce (df, metadati) se lo snapshot esiste ed è compatibile con la
+    versione e lo schema correnti, altrimenti None. Uno snapshot obsoleto viene
+    segnalato in stato_sync()["avviso"] e non viene mostrato.
+    """
+    if not os.path.exists(SNAPSHOT_PATH):
+        return None
+    try:
+        tabella = pq.read_table(SNAPSHOT_PATH)
+        meta = json.loads((tabella.schema.metadata or {}).get(SNAPSHOT_CHIAVE_META, b"{}"))
+    except (OSError, ValueError, pa.ArrowException) as e:
+        stato_sync()["avviso"] = f"Snapshot illeggibile, ricarico da Supabase: {e}"
+        return None
+    if meta.get("versione") != SNAPSHOT_VERSIONE or meta.get("schema") != firma_schema():
+        stato_sync()["avviso"] = (
+            f"Snapshot obsoleto (versione {meta.get('versione')}), ricarico da Supabase"
+        )
+        return None
+    return tabella.to_pandas(), meta
+
+# --- Cache con scope e TTL ---
+
+# Ogni funzione cache-ata appartiene a uno scope con il proprio TTL (secondi).
+# Un aggiornamento invalida solo lo scope dei dati cambiati e quelli che ne dipendono.
+CACHE_TTL = {
+    "dati": leggi_config("GANTT_TTL_DATI", 600),      # età massima prima di un sync automatico
+    "pivot": leggi_config("GANTT_TTL_PIVOT", 3600),
+    "html": leggi_config("GANTT_TTL_HTML", 900),
+}
+DIPENDENZE_SCOPE = {
+    "dati": ["pivot"],
+    "pivot": ["html"],
+    "html": [],
+}
+# voci massime per funzione: con il refresher le versioni vecchie non vengono svuotate subito
+CACHE_MAX_VOCI = {
+    "dati": None,
+    "pivot": leggi_config("GANTT_PIVOT_MAX_VOCI", 32),
+    "html": None,
+}
+FUNZIONI_SCOPE = {scope: [] for scope in CACHE_TTL}  # funzioni che svuotano ogni scope
+
+@st.cache_resource
+def registro_cache():
+    # istante dell'ultima ricostruzione di ogni scope, condiviso tra le sessioni
+    return {scope: None for scope in CACHE_TTL}
+
+def segna_ricostruzione(scope):
+    registro_cache()[scope] = pd.Timestamp.now(tz="Europe/Rome")
+
+def cache_scope(scope):
+    """
+    Decoratore: st.cache_data con il TTL dello scope. La funzione viene registrata
+    nello scope (per l'invalidazione mirata) e ogni cache miss aggiorna l'istante
+    di ultima ricostruzione dello scope.
+    """
+    def decoratore(funzione):
+        @functools.wraps(funzione)
+        def ricostruisci(*args, **kwargs):
+            risultato = funzione(*args, **kwargs)
+            segna_ricostruzione(scope)
+            return risultato
+        cached = st.cache_data(ttl=CACHE_TTL[scope], max_entries=CACHE_MAX_VOCI[scope],
+                               show_spinner=False)(ricostruisci)
+        FUNZIONI_SCOPE[scope].append(cached.clear)
+        return cached
+    return decoratore
+
+def scope_dipendenti(scope):
+    risultato = [scope]
+    for figlio in DIPENDENZE_SCOPE[scope]:
+        risultato += [s for s in scope_dipendenti(figlio) if s not in risultato]
+    return risultato
+
+def invalida_scope(scope):
+    """Svuota lo scope indicato e tutti quelli che dipendono da esso."""
+    for s in scope_dipendenti(scope):
+        for svuota in FUNZIONI_SCOPE[s]:
+            svuota()
+
+# --- Cache dell'HTML renderizzato: LRU per (scheda, versione dati, finestra, oggi, opzioni) ---
+# limite in caratteri (~byte, l'HTML è quasi tutto ASCII): una pagina "Mostra tutto" o un
+# Riassunto pesano molto più di una finestra, un limite sul numero di pagine non basterebbe
+HTML_CACHE_MB = leggi_config("GANTT_HTML_CACHE_MB", 128)
+
+@st.cache_resource
+def cache_html():
+    # condivisa da tutte le sessioni; "giorno" è l'oggi delle voci presenti, "byte" la loro dimensione totale
+    return {"voci": OrderedDict(), "giorno": None, "byte": 0, "lock": threading.Lock()}
+
+def svuota_cache_html():
+    cache = cache_html()
+    with cache["lock"]:
+        cache["voci"].clear()
+        cache["byte"] = 0
+
+FUNZIONI_SCOPE["html"].append(svuota_cache_html)
+
+def html_in_cache(chiave, giorno, costruisci):
+    """
+    Restituisce l'HTML per la chiave, costruendolo solo se manca o è più vecchio del TTL html.
+    A mezzanotte (giorno diverso) la cache si svuota: l'evidenziazione di oggi cambia colonna.
+    Oltre HTML_CACHE_MB escono le pagine usate meno di recente; una pagina più grande
+    dell'intero limite non viene tenuta.
+    """
+    cache = cache_html()
+    adesso = pd.Timestamp.now(tz="Europe/Rome")
+    with cache["lock"]:
+        if cache["giorno"] != giorno:
+            cache["voci"].clear()
+            cache["byte"] = 0
+            cache["giorno"] = giorno
+        voce = cache["voci"].get(chiave)
+        if voce is not None and (adesso - voce[0]).total_seconds() < CACHE_TTL["html"]:
+            cache["voci"].move_to_end(chiave)
+            return voce[1]
+
+    html_code = costruisci()
+    dimensione = len(html_code)
+    limite = HTML_CACHE_MB * 1024 * 1024
+    with cache["lock"]:
+        if cache["giorno"] == giorno and dimensione <= limite:
+            precedente = cache["voci"].pop(chiave, None)
+            if precedente is not None:
+                cache["byte"] -= precedente[2]
+            cache["voci"][chiave] = (adesso, html_code, dimensione)
+            cache["byte"] += dimensione
+            while cache["byte"] > limite:
+                _, uscita = cache["voci"].popitem(last=False)
+                cache["byte"] -= uscita[2]
+    segna_ricostruzione("html")
+    return html_code
+
+# --- Sincronizzazione incrementale ---
+
+@st.cache_resource
+def stato_sync():
+    # stato condiviso dal processo: DataFrame pulito + high-water mark
+    return {
+        "df": None,
+        "hwm": None,
+        "lock": threading.Lock(),
+        "origine": None,          # "snapshot" finché il refresh in background non termina
+        "snapshot_salvato": None,
+        "avviso": None,
+        "versione": 0,            # incrementata ad ogni cambiamento effettivo dei dati
+        "sync_in_corso": False,
+        "lock_sync": threading.Lock(),  # un solo aggiornamento alla volta, senza bloccare i lettori
+        "aggiornato": None,       # fine dell'ultimo sync riuscito (età dei dati mostrati)
+        "richiesta": threading.Event(),  # sveglia il refresher prima dell'intervallo
+        "avviati": 0,             # sync iniziati (numerati in ordine di partenza)
+        "ultimo_completato": 0,   # numero di partenza dell'ultimo sync terminato
+        "preparati": {},          # versione -> (frame preparato, inizio progetti), condiviso dalle sessioni
+        "lock_preparati": threading.Lock(),
+    }
+
+def calcola_hwm(df):
+    if SYNC_TS_COL not in df.columns:
+        return None
+    ts = pd.to_datetime(df[SYNC_TS_COL], errors='coerce', utc=True).max()
+    return None if pd.isna(ts) else ts.isoformat()
+
+def unisci_categorie(a, b):
+    """
+    Porta le colonne categoriche dei due frame sulle stesse categorie (unione ordinata):
+    concat di categoriche con categorie diverse tornerebbe a object.
+    """
+    nuove_a, nuove_b = {}, {}
+    for col in COLONNE_CATEGORICHE:
+        if col not in a.columns or col not in b.columns:
+            continue
+        if not (isinstance(a[col].dtype, pd.CategoricalDtype) and isinstance(b[col].dtype, pd.CategoricalDtype)):
+            continue
+        categorie = a[col].cat.categories.union(b[col].cat.categories)
+        if not a[col].cat.categories.equals(categorie):
+            nuove_a[col] = a[col].cat.set_categories(categorie)
+        if not b[col].cat.categories.equals(categorie):
+            nuove_b[col] = b[col].cat.set_categories(categorie)
+    return (a.assign(**nuove_a) if nuove_a else a), (b.assign(**nuove_b) if nuove_b else b)
+
+def applica_delta(df, delta, ids_presenti=None):
+    """
+    Unisce al DataFrame le righe inserite/modificate (delta, già pulito) sostituendo
+    quelle con lo stesso id, e rimuove le run non più presenti sul server.
+    Una run ripetuta nel delta conta una volta sola, con l'ultima versione ricevuta.
+    """
+    if not delta.empty:
+        delta = delta.drop_duplicates(SYNC_ID_COL, keep="last")
+        df, delta = unisci_categorie(df, delta)
+        df = pd.concat(
+            [df[~df[SYNC_ID_COL].isin(delta[SYNC_ID_COL])], delta],
+            ignore_index=True
+        ).sort_values(SYNC_ID_COL, kind='stable', ignore_index=True)
+    if ids_presenti is not None:
+        df = df[df[SYNC_ID_COL].isin(ids_presenti)].reset_index(drop=True)
+    return df
+
+def stesse_righe(a, b):
+    if len(a) != len(b):
+        return False
+    a = a.sort_values(SYNC_ID_COL, kind='stable', ignore_index=True) if SYNC_ID_COL in a.columns else a.reset_index(drop=True)
+    b = b.sort_values(SYNC_ID_COL, kind='stable', ignore_index=True) if SYNC_ID_COL in b.columns else b.reset_index(drop=True)
+    return a.astype(str).equals(b.astype(str))
+
+@profila
+def sincronizza_dati(completo=False, preriscalda=None):
+    """
+    Aggiorna il DataFrame condiviso scaricando solo le run modificate dopo l'ultimo
+    high-water mark (SYNC_TS_COL >= hwm). Le cancellazioni vengono rilevate
+    confrontando il conteggio esatto del server con le righe locali: solo se
+    differiscono si scarica la colonna degli id.
+    Senza colonne di sincronizzazione (o con completo=True) ricarica tutta la tabella.
+
+    Il download avviene fuori dal lock dei lettori, che continuano a vedere la versione
+    precedente. Se i dati sono cambiati, preriscalda(df, versione) costruisce le viste
+    della nuova versione prima che venga pubblicata; poi frame, hwm e versione vengono
+    sostituiti insieme. Senza preriscalda gli scope dipendenti vengono invalidati.
+    Dopo un sync incrementale preriscalda riceve anche le run toccate (vedi aggiorna_viste).
+
+    Un solo sync alla volta per processo: chi lo richiede mentre un altro è in corso
+    (più sessioni all'avvio, più "Aggiorna dati" insieme) attende e riusa il risultato di
+    un sync partito dopo il suo arrivo, che vede quindi tutte le modifiche precedenti alla
+    richiesta; un sync già in corso all'arrivo può esserne partito prima e non basta.
+    completo=True esegue comunque un caricamento completo.
+    """
+    stato = stato_sync()
+    with stato["lock"]:
+        arrivo = stato["avviati"]
+    with stato["lock_sync"]:
+        if not completo and stato["ultimo_completato"] > arrivo:
+            # un sync partito dopo l'arrivo è terminato mentre si attendeva il lock: vale anche qui
+            with stato["lock"]:
+                return stato["df"]
+        with stato["lock"]:
+            stato["avviati"] += 1
+            avvio = stato["avviati"]
+            precedente, hwm = stato["df"], stato["hwm"]
+            da = f"{stato['versione']}:{hwm}"
+        modifica = None  # run toccate, per l'aggiornamento incrementale delle viste
+        if completo or precedente is None or hwm is None or SYNC_ID_COL not in precedente.columns:
+            df = load_data()
+            cambiato = precedente is None or not stesse_righe(precedente, df)
+        else:
+            # ordine totale (timestamp, id): un UPDATE massivo dà a migliaia di run lo stesso
+            # SYNC_TS_COL e con il solo timestamp le pagine potrebbero ripetere o saltare righe
+            # (scarica_pagina aggiunge SYNC_ID_COL dopo l'ordine del filtro)
+            rows = scarica_sequenziale(
+                filtro=lambda q: q.gte(SYNC_TS_COL, hwm).order(SYNC_TS_COL)
+            )
+            # una run modificata durante il download può comunque arrivare due volte: vale l'ultima
+            delta = pulisci_dati(crea_frame(rows)).drop_duplicates(SYNC_ID_COL, keep="last")
+            # le run esattamente sull'high-water mark tornano ad ogni sync: contano solo se diverse
+            cambiato = not stesse_righe(precedente[precedente[SYNC_ID_COL].isin(delta[SYNC_ID_COL])], delta)
+            df = applica_delta(precedente, delta)
+            toccati = delta[SYNC_ID_COL]
+            if conta_righe() != len(df):
+                # conteggi diversi: run cancellate sul server, oppure run presenti solo lì
+                # (inserite con SYNC_TS_COL sotto l'high-water mark, saltate durante il paging)
+                ids = [r[SYNC_ID_COL] for r in scarica_parallelo(colonne=SYNC_ID_COL)]
+                locali = set(df[SYNC_ID_COL].tolist())
+                mancanti = [i for i in dict.fromkeys(ids) if i not in locali]
+                aggiunte = pulisci_dati(crea_frame(scarica_per_id(mancanti)))
+                rimosse = locali.difference(ids)
+                df = applica_delta(df, aggiunte, ids_presenti=ids)
+                if rimosse or not aggiunte.empty:
+                    # versione nuova solo se qualcosa è davvero entrato o uscito
+                    cambiato = True
+                    toccati = pd.concat([toccati, aggiunte[SYNC_ID_COL],
+                                         precedente.loc[~precedente[SYNC_ID_COL].isin(df[SYNC_ID_COL]), SYNC_ID_COL]])
+            modifica = {"da": da, "precedente": precedente, "ids": toccati.unique()}
+        nuovo_hwm = calcola_hwm(df)
+        if cambiato and preriscalda is not None:
+            # solo chi scrive cambia la versione: la prossima è nota prima della pubblicazione
+            preriscalda(df, f"{stato['versione'] + 1}:{nuovo_hwm}", modifica)
+        with stato["lock"]:
+            stato["df"] = df
+            stato["hwm"] = nuovo_hwm
+            stato["origine"] = "supabase"
+            stato["avviso"] = None
+            stato["aggiornato"] = pd.Timestamp.now(tz="Europe/Rome")
+            stato["ultimo_completato"] = avvio
+            if cambiato:
+                stato["versione"] += 1
+        segna_ricostruzione("dati")
+        if cambiato:
+            # le cache sono indicizzate per versione: con il preriscaldamento quelle vecchie
+            # restano a chi sta ancora leggendo e scadono per TTL o numero di voci
+            if preriscalda is None:
+                invalida_scope("dati")
+            try:
+                salva_snapshot(df, nuovo_hwm)
+            except (OSError, pa.ArrowException) as e:
+                stato["avviso"] = f"Snapshot non salvato: {e}"
+        return df
+
+# --- Refresher in background: un thread per processo che aggiorna e preriscalda ---
+REFRESH_SECONDI = leggi_config("GANTT_REFRESH_SECONDI", CACHE_TTL["dati"])  # 0 = solo su richiesta
+
+def aggiorna_in_background():
+    stato = stato_sync()
+    stato["sync_in_corso"] = True
+    try:
+        sincronizza_dati(preriscalda=preriscalda_viste)
+    except Exception as e:
+        stato["avviso"] = f"Aggiornamento dei dati fallito: {e}"
+    finally:
+        stato["sync_in_corso"] = False
+
+def ciclo_refresher():
+    stato = stato_sync()
+    while True:
+        # attende l'intervallo oppure una richiesta (dati scaduti, "Aggiorna dati")
+        stato["richiesta"].wait(REFRESH_SECONDI or None)
+        stato["richiesta"].clear()
+        aggiorna_in_background()
+
+@st.cache_resource
+def refresher():
+    thread = threading.Thread(target=ciclo_refresher, name="gantt-refresher", daemon=True)
+    thread.start()
+    return thread
+
+def avvia_sync_in_background():
+    refresher()
+    stato_sync()["richiesta"].set()
+
+def dati_correnti():
+    stato = stato_sync()
+    with stato["lock"]:
+        df = stato["df"]
+        if df is None:
+            # avvio a caldo: parto dallo snapshot locale e lo aggiorno in background
+            snapshot = leggi_snapshot()
+            if snapshot is not None:
+                df, meta = snapshot
+                stato["df"] = df
+                stato["hwm"] = meta.get("hwm")
+                stato["origine"] = "snapshot"
+                stato["snapshot_salvato"] = meta.get("salvato")
+                stato["versione"] += 1
+    if df is None:
+        sincronizza_dati()
+    refresher()
+    # TTL dello scope "dati": oltre questa età il refresher viene svegliato subito
+    ultimo_sync = registro_cache()["dati"]
+    if ultimo_sync is None or (pd.Timestamp.now(tz="Europe/Rome") - ultimo_sync).total_seconds() > CACHE_TTL["dati"]:
+        avvia_sync_in_background()
+    with stato["lock"]:
+        # frame e versione letti insieme: la versione identifica esattamente questi dati
+        df, versione = stato["df"], f"{stato['versione']}:{stato['hwm']}"
+    # lo stesso frame per tutte le sessioni, senza copie: va solo letto (vedi dati_preparati)
+    return df, versione
+
+def dati_preparati(df, versione):
+    """
+    Frame ordinato e date di inizio dei progetti (prepara_dati) della versione dei dati,
+    calcolati una volta per processo e condivisi da tutte le sessioni senza copie.
+    Il frame restituito è in sola lettura: chi deve modificarlo lavora su una copia,
+    come i costruttori dei pivot.
+    """
+    stato = stato_sync()
+    with stato["lock_preparati"]:
+        preparati = stato["preparati"]
+        if versione not in preparati:
+            preparati[versione] = prepara_dati(df)
+            # restano la versione pubblicata e quella che il refresher sta preriscaldando
+            while len(preparati) > 2:
+                del preparati[next(iter(preparati))]
+        return preparati[versione]
+
+# --- Filtri: predicati spinti nella query Supabase, una cache per combinazione ---
+# nome del filtro -> colonna di tbl_run_progetti (il periodo filtra Data_svolgimento)
+FILTRI_COLONNE = {"Pista": "Pista", "TE": "TE", "Progetto": "ID_Progetto", "Stato": "Stato"}
+LUNGHEZZA_PREFISSO = 7  # gruppo di progetti, come in ordina_per_gruppo
+
+def valore_postgrest(valore):
+    # tra virgolette: virgole, punti e parentesi nel valore non vengono letti come sintassi
+    return '"' + str(valore).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def filtro_supabase(filtri):
+    """
+    Predicati lato server dei filtri ((nome, valori), ...): il periodo con gte/lt su
+    Data_svolgimento, le altre colonne con ilike *valore* in un solo albero
+    and(or(...), ...). Sul server i valori non sono ancora ripuliti e TE è una lista
+    separata da virgole: la query restituisce un sovrinsieme delle run cercate, che
+    applica_filtri riduce esattamente dopo la pulizia.
+    """
+    filtri = dict(filtri)
+    def filtro(query):
+        if "periodo" in filtri:
+            inizio, fine = filtri["periodo"]
+            dopo_fine = (pd.Timestamp(fine) + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+            query = query.gte("Data_svolgimento", inizio).lt("Data_svolgimento", dopo_fine)
+        condizioni = [
+            "or(" + ",".join(f"{colonna}.ilike.{valore_postgrest(f'*{valore}*')}" for valore in filtri[nome]) + ")"
+            for nome, colonna in FILTRI_COLONNE.items() if nome in filtri
+        ]
+        if condizioni:
+            query = query.or_("and(" + ",".join(condizioni) + ")")
+        return query
+    return filtro
+
+def applica_filtri(df, filtri):
+    """Run di df (già pulito) che soddisfano esattamente i filtri."""
+    filtri = dict(filtri)
+    tenute = np.ones(len(df), dtype=bool)
+    if "periodo" in filtri:
+        inizio, fine = (pd.Timestamp(d) for d in filtri["periodo"])
+        date = df["Data_svolgimento"]
+        tenute &= ((date >= inizio) & (date < fine + pd.Timedelta(days=1))).to_numpy()
+    for nome in ("Pista", "Stato"):
+        if nome in filtri:
+            tenute &= df[nome].isin(filtri[nome]).to_numpy()
+    if "Progetto" in filtri:
+        tenute &= df["ID_Progetto"].str[:LUNGHEZZA_PREFISSO].isin(filtri["Progetto"]).to_numpy(dtype=bool)
+    if "TE" in filtri:
+        # run con almeno uno dei TE scelti nella lista
+        assegnazioni = assegnazioni_te(df)
+        con_te = np.zeros(len(df), dtype=bool)
+        con_te[assegnazioni.loc[assegnazioni["TE"].isin(filtri["TE"]), "_riga"].to_numpy()] = True
+        tenute &= con_te
+    return df[tenute].reset_index(drop=True)
+
+def versione_filtrata(versione, filtri):
+    # versione delle viste filtrate: chiavi di cache distinte da quelle dei dati completi
+    return f"{versione}|{json.dumps(filtri)}"
+
+@cache_scope("dati")
+def dati_filtrati(filtri, versione):
+    """
+    Run che soddisfano i filtri, scaricate con i predicati in query e preparate come
+    i dati completi. Una voce per combinazione di filtri e versione dei dati: quando
+    i dati cambiano la combinazione viene riscaricata.
+    """
+    return prepara_dati(applica_filtri(load_data(filtro=filtro_supabase(filtri)), filtri))[0]
 
 # ordino le piste
 ordine_piste = ['PB1', 'PB2', 'PS', 'Biella']
@@ -76,86 +853,219 @@ def ordina_pista(pista):
     else:
         return len(ordine_piste)
 
-df['ordine_pista'] = df['Pista'].apply(ordina_pista)
-df = df.sort_values(by=['ordine_pista']).drop(columns=['ordine_pista'])
-
-# Calcolo data inizio per progetto (usiamo la prima Data_svolgimento per ID_Progetto)
-df_inizio = (
-    df.dropna(subset=['Data_svolgimento'])
-      .groupby("ID_Progetto", as_index=False)["Data_svolgimento"]
-      .min()
-      .rename(columns={"Data_svolgimento": "Data_inizio_proj"})
-      .sort_values(by="Data_inizio_proj")
-)
-# dizionario con data inizio per ordinare i progetti
-inizio_progetto = dict(zip(df_inizio["ID_Progetto"].astype(str), df_inizio["Data_inizio_proj"]))
+def prepara_dati(df):
+    """Ordina le righe per pista e calcola la data di inizio di ogni progetto."""
+    # sulla categorica ordina_pista gira una volta per pista distinta
+    df = df.assign(ordine_pista=np.asarray(df['Pista'].map(ordina_pista), dtype=np.int64))
+    # ordinamento stabile: a parità di pista resta l'ordine per id, lo stesso in ogni versione
+    # dei dati (l'ordine di comparsa decide tra progetti con la stessa data di inizio)
+    df = df.sort_values(by=['ordine_pista'], kind='stable').drop(columns=['ordine_pista'])
+
+    # Calcolo data inizio per progetto (usiamo la prima Data_svolgimento per ID_Progetto)
+    df_inizio = (
+        df.dropna(subset=['Data_svolgimento'])
+          .groupby("ID_Progetto", as_index=False, observed=True)["Data_svolgimento"]
+          .min()
+          .rename(columns={"Data_svolgimento": "Data_inizio_proj"})
+          .sort_values(by="Data_inizio_proj")
+    )
+    # dizionario con data inizio per ordinare i progetti
+    return df, dict(zip(df_inizio["ID_Progetto"].astype(str), df_inizio["Data_inizio_proj"]))
+
+# Orizzonte del Gantt: dai dati, oppure una finestra mobile attorno ad oggi se configurata
+ORIZZONTE_GIORNI_PRIMA = leggi_config("GANTT_ORIZZONTE_GIORNI_PRIMA", 0)  # 0 = dai dati
+ORIZZONTE_GIORNI_DOPO = leggi_config("GANTT_ORIZZONTE_GIORNI_DOPO", 0)
+
+def orizzonte_date(df, oggi):
+    if ORIZZONTE_GIORNI_PRIMA or ORIZZONTE_GIORNI_DOPO:
+        return oggi - pd.Timedelta(days=ORIZZONTE_GIORNI_PRIMA), oggi + pd.Timedelta(days=ORIZZONTE_GIORNI_DOPO)
+    inizio, fine = finestra_iniziale(oggi)
+    date = df['Data_svolgimento'].dropna()
+    if not date.empty:
+        inizio, fine = min(inizio, date.min().normalize()), max(fine, date.max().normalize())
+    return inizio, fine
 
 # --- Funzioni di supporto ---
-def get_color(progetto_id):
-    # colore stabile per ID_Progetto
-    random.seed(str(progetto_id))
-    colors = ['#f28b82','#fbbc04','#fff475','#ccff90','#a7ffeb','#cbf0f8','#aecbfa','#d7aefb','#fdcfe8']
-    return colors[random.randint(0, len(colors)-1)]
-
-def get_color_by_stato(gruppo, progetto_id=None):
-    """
-    Restituisce il colore della cella in base allo stato delle run.
-    Rosso se almeno una run è 'Da svolgere', altrimenti colore standard per il progetto.
-    """
-    if 'Stato' not in gruppo.columns:
-        return '#cccccc'  # fallback grigio
-    if (gruppo['Stato'] == 'Da svolgere').any():
-        return '#ff6b6b'  # rosso chiaro
-    # altrimenti colore standard
-    if progetto_id is not None:
-        return get_color(progetto_id)
-    return '#aecbfa'  # colore default
-
-def format_progetti(gruppo, mostra_progetto=True, solo_id=False):
-    progetti_dict = {}
-    for _, row in gruppo.iterrows():
-        p = str(row['ID_Progetto']).strip() if pd.notna(row['ID_Progetto']) else ""
-        ms = str(row['Scenario']).strip() if pd.notna(row['Scenario']) else ""
-        if not p:
-            continue
-        if p not in progetti_dict:
-            progetti_dict[p] = set()
-        if ms:
-            progetti_dict[p].add(ms)
+COLORI_PROGETTO = ['#f28b82','#fbbc04','#fff475','#ccff90','#a7ffeb','#cbf0f8','#aecbfa','#d7aefb','#fdcfe8']
+COLORE_DA_SVOLGERE = '#ff6b6b'  # rosso chiaro
 
-    if not progetti_dict:
-        return ""  
+def get_color(progetto_id):
+    # colore stabile per ID_Progetto: generatore locale con seed = ID (seed da stringa
+    # = hash SHA-512, stabile tra processi), lo stato globale di random non viene toccato
+    return COLORI_PROGETTO[random.Random(str(progetto_id)).randint(0, len(COLORI_PROGETTO)-1)]
+
+def build_color_table(ids):
+    """Tabella progetto -> colore, calcolata una volta per tutti i progetti."""
+    return {str(p): get_color(p) for p in pd.unique(ids)}
+
+@cache_scope("pivot")
+def tabella_colori(versione, _df):
+    aggiornata = vista_registrata(("colori",), versione)
+    if aggiornata is not None:
+        return aggiornata[1]
+    tabella = build_color_table(_df['ID_Progetto'])
+    registra_vista(("colori",), versione, tabella)
+    return tabella
+
+def colori_per_stato(ids, rosso, tabella):
+    """
+    Versione vettoriale della regola delle celle: rosso se almeno una run è
+    'Da svolgere', altrimenti il colore del progetto preso dalla tabella.
+    """
+    colori = pd.Series(np.asarray(ids, dtype=object)).map(tabella)
+    mancanti = colori.isna().to_numpy()
+    if mancanti.any():
+        colori[mancanti] = [get_color(p) for p in np.asarray(ids, dtype=object)[mancanti]]
+    return np.where(np.asarray(rosso, dtype=bool), COLORE_DA_SVOLGERE, colori.to_numpy())
 
-    progetti_ordinati = sorted(
-        progetti_dict.keys(),
-        key=lambda x: inizio_progetto.get(str(x), pd.Timestamp.max)
+def formatta_progetti(df, index_col, inizio, colori):
+    """
+    Formatta tutte le celle (index_col, Data_svolgimento, Turno) del Gantt Piste/TE
+    con poche aggregazioni sull'intero frame invece di una chiamata per gruppo.
+    Per ogni progetto della cella: scenari distinti ordinati, rosso se almeno una
+    run è 'Da svolgere', progetti ordinati per data di inizio (inizio, da prepara_dati;
+    a parità, per prima comparsa nella cella), colore dalla tabella colori.
+    Restituisce un DataFrame [index_col, Data_svolgimento, Turno, Progetti].
+    """
+    chiavi = [index_col, 'Data_svolgimento', 'Turno']
+    t = df.dropna(subset=chiavi)
+    righe = pd.DataFrame({
+        **{k: t[k].to_numpy() for k in chiavi},
+        '_p': stringhe(t['ID_Progetto']),
+        '_s': stringhe(t['Scenario']),
+        '_rosso': (t['Stato'] == 'Da svolgere').to_numpy(),
+        '_pos': np.arange(len(t)),
+    })
+    celle = righe[chiavi].drop_duplicates()
+    righe = righe[righe['_p'] != ""]
+
+    # un record per (cella, progetto): prima comparsa e stato
+    progetti = (
+        righe.groupby(chiavi + ['_p'], sort=False, observed=True)
+             .agg(_pos=('_pos', 'min'), _rosso=('_rosso', 'any'))
+             .reset_index()
+    )
+    scenari = (
+        righe[righe['_s'] != ""]
+            .drop_duplicates(chiavi + ['_p', '_s'])
+            .sort_values('_s', kind='stable')
+            .astype({'_s': object})  # join per gruppo: su una categorica ogni gruppo verrebbe decodificato
+            .groupby(chiavi + ['_p'], sort=False, observed=True)['_s']
+            .agg(", ".join)
+            .rename('_scenari')
+    )
+    progetti = progetti.join(scenari, on=chiavi + ['_p'])
+    progetti['_p'] = progetti['_p'].astype(object)
+    progetti['_inizio'] = progetti['_p'].map(inizio).fillna(pd.Timestamp.max)
+    progetti = progetti.sort_values(['_inizio', '_pos'], kind='stable')
+
+    progetti['_colore'] = colori_per_stato(progetti['_p'], progetti['_rosso'], colori)
+    progetti['_html'] = [
+        f"<div class='cell-content' style='background-color:{colore}; padding:2px 6px; border-radius:5px; margin-bottom:2px;max-height:38px; overflow:hidden;'>"
+        f"<small>{f'<b>{p}</b> ({sc})' if isinstance(sc, str) else f'<b>{p}</b>'}</small></div>"
+        for p, sc, colore in zip(progetti['_p'], progetti['_scenari'], progetti['_colore'])
+    ]
+    testo = progetti.groupby(chiavi, sort=False)['_html'].agg("".join).rename('Progetti')
+    return celle.join(testo, on=chiavi).fillna({'Progetti': ""})
+
+def formatta_scenari(df, chiavi, sotto):
+    """
+    Parte comune di Gantt Piste e Gantt Progetti: per ogni cella (chiavi) e
+    sottogruppo (sotto) restituisce gli scenari come span colorati (rosso se almeno
+    una run è 'Da svolgere'), ordinati come stringhe HTML e uniti da ', '.
+    Il frame restituito ha una riga per (cella, sottogruppo), ordinata per sottogruppo.
+    """
+    t = df.dropna(subset=chiavi).copy()
+    for c in ['Scenario', 'Stato'] + [c for c in sotto if c in t.columns]:
+        t[c] = riempi(t[c], '')
+    t['_rosso'] = t['Stato'] == 'Da svolgere'
+
+    span = (
+        t[t['Scenario'] != '']
+            .groupby(chiavi + sotto + ['Scenario'], sort=False, observed=True)['_rosso']
+            .any()
+            .reset_index()
+    )
+    span['_span'] = [
+        f"<span style='color:{'#ff0000' if rosso else '#000000'}; font-weight:bold'>{scen}</span>"
+        for scen, rosso in zip(span['Scenario'], span['_rosso'])
+    ]
+    span = (
+        span.sort_values('_span', kind='stable')
+            .groupby(chiavi + sotto, sort=False, observed=True)['_span']
+            .agg(', '.join)
+    )
+    gruppi = t[chiavi + sotto].drop_duplicates().sort_values(chiavi + sotto, kind='stable')
+    return gruppi.join(span, on=chiavi + sotto)
+
+def unisci_celle(gruppi, chiavi, intestazione, parti):
+    # un solo passaggio: intestazione della cella + blocchi dei sottogruppi non vuoti
+    celle = {}
+    for chiave, parte in zip(zip(*[gruppi[k] for k in chiavi]), parti):
+        blocchi = celle.setdefault(chiave, [intestazione(chiave)])
+        if parte:
+            blocchi.append(parte)
+    return pd.DataFrame(
+        [(*chiave, "<div style='margin-bottom:4px'>" + "<div style='height:4px'></div>".join(blocchi) + "</div>")
+         for chiave, blocchi in celle.items()],
+        columns=chiavi + ['Celle']
     )
 
-    progetti_formattati = []
-    for p in progetti_ordinati:
-        scenari = progetti_dict[p]
-        scenari_str = ", ".join(sorted(scenari)) if scenari else ""
-        contenuto = f"<b>{p}</b> ({scenari_str})" if scenari_str else f"<b>{p}</b>"
-        
-        colore = get_color_by_stato(gruppo[gruppo['ID_Progetto'] == p], progetto_id=p)
-
-        progetti_formattati.append(
-            f"<div class='cell-content' style='background-color:{colore}; padding:2px 6px; border-radius:5px; margin-bottom:2px;max-height:38px; overflow:hidden;'>"
-            f"<small>{contenuto}</small></div>"
-        )
+def per_progetto(df):
+    # prima data di ogni progetto, con indice di stringhe anche se ID_Progetto è categorica
+    inizi = df.groupby("ID_Progetto", observed=True)["Data_svolgimento"].min()
+    inizi.index = inizi.index.astype(object)
+    return inizi
 
-    return "".join(progetti_formattati)
+def inizi_da_setup(df):
+    # prima data delle run di Setup(OR)/Setup(Pretest) di ogni progetto
+    setup_mask = df['Scenario'].str.contains("Setup\(OR\)|Setup\(Pretest\)", regex=True, case=False)
+    return per_progetto(df[setup_mask.to_numpy(dtype=bool)])
 
 def get_project_start_dates(df):
-    setup_mask = df['Scenario'].str.contains("Setup\(OR\)|Setup\(Pretest\)", regex=True, case=False)
-    start_dates = df[setup_mask].groupby("ID_Progetto")["Data_svolgimento"].min()
+    start_dates = inizi_da_setup(df)
 
     if start_dates.empty:
         # fallback: prendo comunque la prima data di quel progetto
-        start_dates = df.groupby("ID_Progetto")["Data_svolgimento"].min()
+        start_dates = per_progetto(df)
 
     return start_dates
 
+# --- Assegnazioni run -> TE: tabella normalizzata condivisa da pivot, tooltip e statistiche ---
+
+def assegnazioni_te(df, colonna="TE"):
+    """
+    Tabella normalizzata run -> TE: una riga per ogni nome della lista separata da virgole
+    (ripulito come con str.split(',') + strip), con la posizione della run in df (_riga),
+    il giorno e il turno. È ordinata per (TE, Data_svolgimento, Turno) e, a parità, per
+    posizione della run; le run senza TE non compaiono.
+    Ogni valore distinto della colonna viene diviso una volta sola, non una volta per run.
+    """
+    valori = df[colonna]
+    if not isinstance(valori.dtype, pd.CategoricalDtype):
+        valori = categorica(valori)
+    liste = [[nome.strip() for nome in str(v).split(',')] for v in valori.cat.categories]
+    lunghezze = np.array([len(l) for l in liste], dtype=np.int64)
+    nomi = pd.Index([nome for l in liste for nome in l], dtype=object)
+    categorie = nomi.unique().sort_values()
+    codici_nomi = categorie.get_indexer(nomi)
+    primo = np.cumsum(lunghezze) - lunghezze  # posizione in `nomi` del primo nome di ogni valore
+
+    codici = valori.cat.codes.to_numpy()
+    con_te = np.flatnonzero(codici >= 0)
+    quanti = lunghezze[codici[con_te]]
+    riga = np.repeat(con_te, quanti)
+    # k-esimo nome della lista di ogni run
+    k = np.arange(len(riga)) - np.repeat(np.cumsum(quanti) - quanti, quanti)
+    tabella = pd.DataFrame({
+        colonna: pd.Categorical.from_codes(codici_nomi[np.repeat(primo[codici[con_te]], quanti) + k],
+                                           categories=categorie),
+        'Data_svolgimento': df['Data_svolgimento'].to_numpy()[riga],
+        'Turno': df['Turno'].array.take(riga),
+        '_riga': riga,
+    })
+    return tabella.sort_values([colonna, 'Data_svolgimento', 'Turno'], kind='stable', ignore_index=True)
+
 def extract_text(html_content):
     if not html_content:
         return ""
@@ -163,123 +1073,169 @@ def extract_text(html_content):
     texts = [t.strip().replace(",", "\n") for t in soup.stripped_strings]  # virgola → a capo
     return "\n".join(dict.fromkeys(texts))  # rimuove duplicati e unisce con newline
 
-def build_rich_tooltip_from_df(df_source, index_col, idx_value, day_ts, split_comma=False):
+@profila
+def build_tooltip_index(df_source, index_col, split_comma=False, assegnazioni=None):
     """
-    Costruisce il tooltip HTML leggibile a partire dai dati grezzi:
-    - Raggruppa per ID_Progetto
-    - Deduplica (Scenario, Pista, TE, AL, Piattaforma)
-    - Ritorna un HTML con <b>ID</b> e righe "Scenario | Pista | TE | AL | Piattaforma"
-      con colonne allineate.
+    Precalcola i tooltip di tutte le celle in un colpo solo: restituisce un dizionario
+    {(chiave, giorno): html}. Per ogni cella raggruppa per ID_Progetto, deduplica
+    (Scenario, Pista, TE, AL, Piattaforma) e allinea le colonne con un padding comune.
+    Per "TE" con split_comma la chiave è il singolo TE della lista separata da virgole,
+    preso da assegnazioni (assegnazioni_te di df_source, calcolata se manca).
     """
-    if pd.isna(day_ts) or idx_value is None or str(idx_value).strip() == "":
-        return ""
-
-    # Filtro per giorno
-    sub = df_source[df_source["Data_svolgimento"] == day_ts].copy()
-    if sub.empty:
-        return ""
+    cols_keep = ["ID_Progetto", "Scenario", "Pista", "TE", "AL", "Piattaforma"]
+    cols_pad = ["Scenario", "Pista", "TE", "AL", "Piattaforma"]
 
-    key = str(idx_value).strip()
+    # colonne categoriche: drop_duplicates e sort lavorano sui codici (ordine lessicale)
+    norm = pd.DataFrame({c: stringhe(df_source[c]) for c in cols_keep})
+    norm["_giorno"] = df_source["Data_svolgimento"].to_numpy()
 
     if index_col == "TE" and split_comma:
-        def te_has(te):
-            if pd.isna(te):
-                return False
-            return any(t.strip() == key for t in str(te).split(","))
-        sub = sub[sub["TE"].apply(te_has)]
+        if assegnazioni is None:
+            assegnazioni = assegnazioni_te(df_source, index_col)
+        norm = norm.take(assegnazioni["_riga"]).assign(_chiave=assegnazioni[index_col].array)
     else:
-        sub = sub[sub[index_col].astype(str).str.strip() == key]
-
-    if sub.empty:
-        return ""
-
-    # Colonne opzionali
-    for col in ["AL", "Piattaforma"]:
-        if col not in sub.columns:
-            sub[col] = ""
+        norm["_chiave"] = stringhe(df_source[index_col], "nan")
+    norm = norm[norm["_giorno"].notna()]
 
-    # Normalizza stringhe
-    for c in ["ID_Progetto", "Scenario", "Pista", "TE", "AL", "Piattaforma"]:
-        if c in sub.columns:
-            sub[c] = sub[c].fillna("").astype(str).str.strip()
-        else:
-            sub[c] = ""
-
-    # Deduplica righe scenario/risorse per progetto
-    cols_keep = ["ID_Progetto", "Scenario", "Pista", "TE", "AL", "Piattaforma"]
     dedup = (
-        sub[cols_keep]
-        .drop_duplicates()
-        .sort_values(["ID_Progetto", "Scenario", "Pista", "TE", "AL", "Piattaforma"])
+        norm.drop_duplicates(["_chiave", "_giorno"] + cols_keep)
+            .sort_values(["_chiave", "_giorno"] + cols_keep)
     )
+    if dedup.empty:
+        return {}
+
+    # larghezza massima di ogni colonna per cella (chiave, giorno)
+    celle = [dedup["_chiave"], dedup["_giorno"]]
+    larghezze = [dedup[c].str.len().groupby(celle, sort=False, observed=True).transform("max") for c in cols_pad]
+
+    indice = {}
+    parts, cella_corrente, proj_corrente = [], None, None
+    for chiave, giorno, proj, *valori in zip(
+        dedup["_chiave"], dedup["_giorno"], dedup["ID_Progetto"],
+        *[dedup[c] for c in cols_pad], *larghezze
+    ):
+        cella = (chiave, giorno)
+        if cella != cella_corrente:
+            if cella_corrente is not None:
+                indice[cella_corrente] = "<div class='tt-wrap'>" + "".join(parts) + "</div>"
+            parts, cella_corrente, proj_corrente = [], cella, None
+        if proj != proj_corrente:
+            parts.append(f"<div class='tt-proj'><b>{html.escape(proj)}</b></div>")
+            proj_corrente = proj
+        testi, larg = valori[:len(cols_pad)], valori[len(cols_pad):]
+        line = " | ".join(t.ljust(int(l)) for t, l in zip(testi, larg))
+        parts.append(f"<div class='tt-row' style='font-family:monospace;'>{html.escape(line)}</div>")
+    indice[cella_corrente] = "<div class='tt-wrap'>" + "".join(parts) + "</div>"
+    return indice
+
+@cache_scope("pivot")
+def tabella_te(versione, _df):
+    # assegnazioni run -> TE della versione dei dati, condivise da pivot TE, tooltip e statistiche
+    return assegnazioni_te(_df)
+
+@cache_scope("pivot")
+def indice_tooltip(index_col, split_comma, versione, _df):
+    # un indice per colonna e versione dei dati, condiviso da tutte le sessioni
+    aggiornato = vista_registrata(("tooltip", index_col, split_comma), versione)
+    if aggiornato is not None:
+        return aggiornato[1]
+    assegnazioni = tabella_te(versione, _df) if index_col == "TE" and split_comma else None
+    indice = build_tooltip_index(_df, index_col, split_comma, assegnazioni)
+    registra_vista(("tooltip", index_col, split_comma), versione, indice)
+    return indice
+
+# --- Motore comune delle tabelle HTML (metadati calcolati una volta per colonna) ---
+def classi_colonna(data, turno, oggi):
+    classes = []
+    if data == oggi: classes.append("today-col")
+    if data.weekday() >= 5: classes.append("weekend-col")
+    if data in giorni_festivi: classes.append("holiday-col")
+    if turno == "N": classes.append("day-separator")
+    return " ".join(classes)
+
+def metadati_colonne(colonne, oggi, separatore_turno=True, turno_in_testata=True):
+    """Per ogni colonna (data, turno) o data: giorno, classi CSS e cella d'intestazione."""
+    giorni, classi, intestazioni = [], [], []
+    for col in colonne:
+        data, turno = col if isinstance(col, tuple) else (col, "")
+        classe = classi_colonna(data, turno if separatore_turno else "", oggi)
+        testo = f'{data.strftime("%d/%m/%y")}<br>{turno}' if turno_in_testata else data.strftime("%d/%m/%y")
+        giorni.append(data)
+        classi.append(classe)
+        intestazioni.append(f'<th class="{classe}">{testo}</th>')
+    return giorni, classi, intestazioni
+
+def corpo_tabella(pivot_df, oggi, indice_tooltip=None, separatori=False, colori=False,
+                  separatore_turno=True, turno_in_testata=True):
+    """
+    Intestazioni + righe di una tabella Gantt in un solo passaggio sugli array del pivot.
+    - indice_tooltip: celle con tooltip ricco (tip-box) letto dall'indice precalcolato
+    - separatori: riga grigia quando cambia il prefisso del progetto (primi 7 caratteri)
+    - colori: i valori sono colori di sfondo e le celle restano vuote
+    """
+    giorni, classi, intestazioni = metadati_colonne(pivot_df.columns, oggi, separatore_turno, turno_in_testata)
+    valori = pivot_df.to_numpy(dtype=object)
+    valori = np.where(pd.isna(valori), "", valori)
+
+    parti = intestazioni
+    if colori:
+        parti.append('</tr>')
+        aperture = [f'<td class="{c}"' for c in classi]
+    else:
+        aperture = [f'<td class="{c} has-tip"><div class="tip-box">' for c in classi]
+    separatore = f'<tr style="height:5px; background:#aaa" data-separator="1"><td colspan="{len(classi) + 1}"></td></tr>'
 
-    # Trova larghezza massima di ogni colonna per l’allineamento
-    max_len = [0]*5
-    for _, r in dedup.iterrows():
-        for i, col in enumerate(["Scenario", "Pista", "TE", "AL", "Piattaforma"]):
-            max_len[i] = max(max_len[i], len(r[col]))
-
-    # Costruisci HTML
-    parts = []
-    for proj, blocco in dedup.groupby("ID_Progetto"):
-        parts.append(f"<div class='tt-proj'><b>{html.escape(proj)}</b></div>")
-        for _, r in blocco.iterrows():
-            line = " | ".join([
-                r["Scenario"].ljust(max_len[0]),
-                r["Pista"].ljust(max_len[1]),
-                r["TE"].ljust(max_len[2]),
-                r["AL"].ljust(max_len[3]),
-                r["Piattaforma"].ljust(max_len[4])
-            ])
-            parts.append(f"<div class='tt-row' style='font-family:monospace;'>{html.escape(line)}</div>")
-
-    return "<div class='tt-wrap'>" + "".join(parts) + "</div>"
+    last_group = None
+    for idx, riga in zip(pivot_df.index, valori):
+        if separatori:
+            prefix = str(idx)[:7]
+            if last_group is not None and prefix != last_group:
+                parti.append(separatore)
+            last_group = prefix
+
+        parti.append(f'<tr><td>{idx}</td>')
+        if colori:
+            parti.extend(
+                f'{a} style="background-color:{v}"></td>' if v else f'{a}></td>'
+                for a, v in zip(aperture, riga)
+            )
+        else:
+            chiave = "" if idx is None else str(idx).strip()
+            tips = indice_tooltip if indice_tooltip and chiave else {}
+            parti.extend(
+                f'{a}{tips.get((chiave, g), "")}</div>{v}</td>'
+                for a, g, v in zip(aperture, giorni, riga)
+            )
+        parti.append('</tr>')
+    return "".join(parti)
 
 # TABELLA PER GANTT PISTE
 
-def format_pista(gruppo):
-    if gruppo.empty:
-        return ""
-
-    gruppo = gruppo.fillna('')  # sostituisci NaN con stringa vuota
-    pista = str(gruppo['Pista'].iloc[0]) if 'Pista' in gruppo.columns else "Sconosciuta"
-
-    html_parts = []
-    html_parts.append(f"<div><strong style='color:blue'>{pista}</strong></div>")
-
-    # raggruppiamo per progetto + piattaforma
-    for (proj, piattaforma), sub in gruppo.groupby(['ID_Progetto', 'Piattaforma']):
-        scenari_html = []
-        for scen, sgroup in sub.groupby('Scenario'):
-            if not scen:
-                continue
-            colore_testo = "#ff0000" if (sgroup['Stato'] == 'Da svolgere').any() else "#000000"
-            scenari_html.append(f"<span style='color:{colore_testo}; font-weight:bold'>{scen}</span>")
-
-        gruppo_html = ""
-        if scenari_html:
-            gruppo_html += f"<div>{', '.join(sorted(scenari_html))}</div>"
-        gruppo_html += f"<div><small style='color:blue'>{proj}</small> - <small style='color:green'>{piattaforma}</small></div>"
-
-        if gruppo_html:
-            html_parts.append(gruppo_html)
-
-    return "<div style='margin-bottom:4px'>" + "<div style='height:4px'></div>".join(html_parts) + "</div>"
+def formatta_pista(df):
+    chiavi = ['Pista', 'Data_svolgimento', 'Turno']
+    gruppi = formatta_scenari(df, chiavi, ['ID_Progetto', 'Piattaforma'])
+    parti = [
+        (f"<div>{scenari}</div>" if isinstance(scenari, str) else "")
+        + f"<div><small style='color:blue'>{proj}</small> - <small style='color:green'>{piattaforma}</small></div>"
+        for proj, piattaforma, scenari in zip(gruppi['ID_Progetto'], gruppi['Piattaforma'], gruppi['_span'])
+    ]
+    celle = unisci_celle(
+        gruppi, chiavi,
+        lambda chiave: f"<div><strong style='color:blue'>{chiave[0]}</strong></div>",
+        parti
+    )
+    return celle.rename(columns={'Celle': 'Piste'})
 
+@profila
 def build_pivot_piste(df, index_col='Pista'):
     # 1️⃣ Gestione Turno nullo: duplico in M e P
-    df['Turno'] = df['Turno'].fillna('M|P')
+    df['Turno'] = riempi(df['Turno'], 'M|P')
     df = df.assign(Turno=df['Turno'].str.split('|')).explode('Turno')
 
-    # 2️⃣ Groupby (pista, data, turno)
-    df_grouped = df.groupby(['Pista', 'Data_svolgimento', 'Turno']).apply(
-        lambda g: format_pista(g)
-    ).reset_index(name='Piste')
+    # 2️⃣ Formattazione di tutte le celle (pista, data, turno)
+    df_grouped = formatta_pista(df)
 
-    # 3️⃣ Pivot
-    all_dates = pd.date_range('2025-01-01', '2026-05-10', freq='D')
-    turni = ['M','P','N']
-    multi_cols = pd.MultiIndex.from_product([all_dates, turni], names=['Data_svolgimento','Turno'])
+    # 3️⃣ Pivot sparso: solo le colonne (data, turno) occupate, i giorni vuoti si aggiungono in render
     pivot = df_grouped.pivot_table(
         index=index_col, 
         columns=['Data_svolgimento', 'Turno'], 
@@ -287,17 +1243,17 @@ def build_pivot_piste(df, index_col='Pista'):
         aggfunc='first',  
         fill_value=''
     )
-    pivot = pivot.reindex(columns=multi_cols, fill_value='')
 
     return pivot
 
-def render_html_table_piste(pivot_df, table_id, df_source, split_comma=False, ordine_first_col=None):
+@profila
+def render_html_table_piste(pivot_df, table_id, df_source, split_comma=False, ordine_first_col=None, _indice_tooltip=None, finestra=None):
     oggi = pd.Timestamp.today().normalize()
+    if _indice_tooltip is None:
+        _indice_tooltip = build_tooltip_index(df_source, "Pista", split_comma)
 
-    # --- FILTRO INIZIALE 10-30 GIORNI ---
-    all_dates = pivot_df.columns.get_level_values(0) if isinstance(pivot_df.columns, pd.MultiIndex) else pivot_df.columns
-    filtro_iniziale = (all_dates >= oggi - pd.Timedelta(days=10)) & (all_dates <= oggi + pd.Timedelta(days=30))
-    pivot_filtrato = pivot_df.loc[:, filtro_iniziale]
+    # --- FINESTRA VISIBILE (default 10-30 giorni, giorni vuoti riempiti solo qui) ---
+    pivot_filtrato = espandi_colonne(pivot_df, *(finestra or finestra_iniziale(oggi)))
 
     html_code = f'''
     <style>
@@ -397,64 +1353,14 @@ def render_html_table_piste(pivot_df, table_id, df_source, split_comma=False, or
     </style>
 
     <button class="btn-today" onclick="vaiAdOggi()">Vai ad oggi</button>
-    <button class="btn-today" onclick="mostraTutto()">Mostra tutto</button>
-
-    <div id="pivotCompleto" style="display:none">
-        {pivot_df.to_html(escape=False, index=False)}
-    </div>
 
     <div class="table-wrapper" id="{table_id}" tabindex="0">
     <table>
       <tr>
         <th>Pista</th>'''
 
-    # intestazioni date/turno
-    for col in pivot_filtrato.columns:
-        if isinstance(col, tuple):
-            data, turno = col
-        else:
-            data, turno = col, ""
-
-        is_weekend = data.weekday() >= 5
-        is_holiday = data in giorni_festivi
-        classes = []
-        if data == oggi: classes.append("today-col")
-        if is_weekend:   classes.append("weekend-col")
-        if is_holiday:   classes.append("holiday-col")
-        if turno == "N": classes.append("day-separator")
-        class_attr = " ".join(classes)
-
-        html_code += f'<th class="{class_attr}">{data.strftime("%d/%m/%y")}<br>{turno}</th>'
-
-    # righe
-    last_group = None
-    for idx, row in pivot_filtrato.iterrows():
-        html_code += f'<tr><td>{idx}</td>'
-        for col in pivot_filtrato.columns:
-            if isinstance(col, tuple):
-                data, turno = col
-            else:
-                data, turno = col, ""
-
-            is_weekend = data.weekday() >= 5
-            is_holiday = data in giorni_festivi
-            classes = []
-            if data == oggi: classes.append("today-col")
-            if is_weekend:   classes.append("weekend-col")
-            if is_holiday:   classes.append("holiday-col")
-            if turno == "N": classes.append("day-separator")
-            class_attr = " ".join(classes)
-
-            cell_value = row[col] if pd.notna(row[col]) else ""
-            tip_html = build_rich_tooltip_from_df(
-                df_source=df_source,
-                index_col="Pista",
-                idx_value=idx,
-                day_ts=data,
-                split_comma=split_comma
-            )
-            html_code += f'<td class="{class_attr} has-tip"><div class="tip-box">{tip_html}</div>{cell_value}</td>'
-        html_code += '</tr>'
+    # intestazioni date/turno e righe in un solo passaggio
+    html_code += corpo_tabella(pivot_filtrato, oggi, _indice_tooltip)
 
     ordine_first_col_js = f'const ordine_first_col = {ordine_first_col};' if ordine_first_col else 'const ordine_first_col = null;'
 
@@ -465,12 +1371,6 @@ def render_html_table_piste(pivot_df, table_id, df_source, split_comma=False, or
     <script>
     {ordine_first_col_js}
 
-    const pivotCompleto = `{pivot_df.to_html(escape=False, index=False)}`;
-
-    function mostraTutto(){{
-        document.getElementById("{table_id}").innerHTML = pivotCompleto;
-    }}
-
     function vaiAdOggi() {{
       document.querySelectorAll(".table-wrapper").forEach(wrapper => {{
         const todayCell = wrapper.querySelector(".today-col");
@@ -501,59 +1401,39 @@ def render_html_table_piste(pivot_df, table_id, df_source, split_comma=False, or
     return html_code
 
 #TABELLA PER GANTT PROGETTI
-def format_solo_scenario(gruppo):
-    if gruppo.empty:
-        return ""
-
-    gruppo = gruppo.fillna('')  # sostituisci NaN con stringa vuota
-
-    progetto_id = str(gruppo['ID_Progetto'].iloc[0]) if 'ID_Progetto' in gruppo.columns else "Sconosciuto"
-
-    # creiamo chiave unica per combinazione pista + piattaforma
-    gruppo['key'] = gruppo['Pista'].astype(str) + '||' + gruppo['Piattaforma'].astype(str)
-
-    html_parts = []
-
-    # riga iniziale con ID progetto
-    html_parts.append(f"<div><strong style='color:blue'>{progetto_id}</strong></div>")
-
-    # raggruppiamo per combinazione pista-piattaforma
-    for key, sub in gruppo.groupby('key'):
-        # determinare lo stato complessivo per ogni scenario
-        scenari_html = []
-        for scen, sgroup in sub.groupby('Scenario'):
-            if not scen:
-                continue
-            colore_testo = "#ff0000" if (sgroup['Stato'] == 'Da svolgere').any() else "#000000"
-            scenari_html.append(f"<span style='color:{colore_testo}; font-weight:bold'>{scen}</span>")
-
+def formatta_solo_scenario(df):
+    chiavi = ['ID_Progetto', 'Data_svolgimento', 'Turno']
+    # chiave unica per combinazione pista + piattaforma (anche l'ordine segue questa stringa)
+    df = df.assign(key=riempi(df['Pista'], '').astype(str) + '||' + riempi(df['Piattaforma'], '').astype(str))
+    gruppi = formatta_scenari(df, chiavi, ['key'])
+
+    parti = []
+    for key, scenari in zip(gruppi['key'], gruppi['_span']):
         pista, piattaforma = key.split('||')
-
-        gruppo_html = ""
-        if scenari_html:
-            gruppo_html += f"<div>{', '.join(sorted(scenari_html))}</div>"
+        gruppo_html = f"<div>{scenari}</div>" if isinstance(scenari, str) else ""
         if pista or piattaforma:
             gruppo_html += f"<div><small style='color:blue'>{pista}</small> - <small style='color:green'>{piattaforma}</small></div>"
+        parti.append(gruppo_html)
 
-        if gruppo_html:
-            html_parts.append(gruppo_html)
-
-    return "<div style='margin-bottom:4px'>" + "<div style='height:4px'></div>".join(html_parts) + "</div>"
+    celle = unisci_celle(
+        gruppi, chiavi,
+        lambda chiave: f"<div><strong style='color:blue'>{chiave[0]}</strong></div>",
+        parti
+    )
+    return celle.rename(columns={'Celle': 'Progetti'})
 
-def build_pivot_progetti_solo_scenario(df, index_col='ID_Progetto', solo_id=False):
+def celle_progetti_solo_scenario(df):
     # 1️⃣ Gestione Turno nullo: duplico in M e P
-    df['Turno'] = df['Turno'].fillna('M|P')
-    df = df.assign(Turno=df['Turno'].str.split('|')).explode('Turno')
+    df = df.assign(Turno=riempi(df['Turno'], 'M|P').str.split('|')).explode('Turno')
 
-    # 2️⃣ Groupby dopo aver sistemato i Turni
-    df_grouped = df.groupby(['ID_Progetto', 'Data_svolgimento', 'Turno']).apply(
-        lambda g: format_solo_scenario(g)
-    ).reset_index(name='Progetti')
+    # 2️⃣ Formattazione di tutte le celle dopo aver sistemato i Turni
+    return formatta_solo_scenario(df)
 
-    # 3️⃣ Pivot
-    all_dates = pd.date_range('2025-01-01', '2026-05-10', freq='D')
-    turni = ['M','P','N']
-    multi_cols = pd.MultiIndex.from_product([all_dates, turni], names=['Data_svolgimento','Turno'])
+@profila
+def build_pivot_progetti_solo_scenario(df, index_col='ID_Progetto', solo_id=False):
+    df_grouped = celle_progetti_solo_scenario(df)
+
+    # 3️⃣ Pivot sparso: solo le colonne (data, turno) occupate, i giorni vuoti si aggiungono in render
     pivot = df_grouped.pivot_table(
         index=index_col, 
         columns=['Data_svolgimento', 'Turno'], 
@@ -561,17 +1441,17 @@ def build_pivot_progetti_solo_scenario(df, index_col='ID_Progetto', solo_id=Fals
         aggfunc='first',  
         fill_value=''
     )
-    pivot = pivot.reindex(columns=multi_cols, fill_value='')
 
     return pivot
 
-def render_html_table_grouped(pivot_df, index_name, table_id, df_source, index_col, split_comma=False, ordine_first_col=None):
+@profila
+def render_html_table_grouped(pivot_df, index_name, table_id, df_source, index_col, split_comma=False, ordine_first_col=None, _indice_tooltip=None, finestra=None):
     oggi = pd.Timestamp.today().normalize()
+    if _indice_tooltip is None:
+        _indice_tooltip = build_tooltip_index(df_source, index_col, split_comma)
 
-    # --- FILTRO INIZIALE 10-30 GIORNI ---
-    all_dates = pivot_df.columns.get_level_values(0) if isinstance(pivot_df.columns, pd.MultiIndex) else pivot_df.columns
-    filtro_iniziale = (all_dates >= oggi - pd.Timedelta(days=10)) & (all_dates <= oggi + pd.Timedelta(days=30))
-    pivot_filtrato = pivot_df.loc[:, filtro_iniziale]
+    # --- FINESTRA VISIBILE (default 10-30 giorni, giorni vuoti riempiti solo qui) ---
+    pivot_filtrato = espandi_colonne(pivot_df, *(finestra or finestra_iniziale(oggi)))
 
     html_code = f'''
     <style>
@@ -675,82 +1555,14 @@ def render_html_table_grouped(pivot_df, index_name, table_id, df_source, index_c
     </style>
 
     <button class="btn-today" onclick="vaiAdOggi()">Vai ad oggi</button>
-    <button class="btn-today" onclick="mostraTutto()">Mostra tutto</button>
-
-    <div id="pivotCompleto" style="display:none">
-        {pivot_df.to_html(escape=False, index=False)}
-    </div>
 
     <div class="table-wrapper" id="{table_id}" tabindex="0">
     <table>
       <tr>
         <th>{index_name}</th>'''
 
-    for col in pivot_filtrato.columns:
-        # Se le colonne sono MultiIndex (data, turno)
-        if isinstance(col, tuple):
-            data = col[0]
-            turno = col[1]
-        else:
-            data = col
-            turno = ""
-
-        is_weekend = data.weekday() >= 5
-        is_holiday = data in giorni_festivi
-        classes = []
-        if data == oggi: 
-            classes.append("today-col")
-        if is_weekend:  
-            classes.append("weekend-col")
-        if is_holiday:  
-            classes.append("holiday-col")
-        # aggiungi bordo se è l'ultimo turno del giorno
-        if turno == "N":  
-            classes.append("day-separator")  # 🔹 bordo su ultimo turno del giorno
-        class_attr = " ".join(classes)
-
-        html_code += f'<th class="{class_attr}">{data.strftime("%d/%m/%y")}<br>{turno}</th>'
-
-
-    last_group = None
-    for idx, row in pivot_filtrato.iterrows():
-        # Prefisso progetto: primi 7 caratteri
-        prefix = str(idx)[:7]
-        if last_group is not None and prefix != last_group:
-            # riga separatore tra gruppi
-            html_code += f'<tr style="height:5px; background:#aaa"><td colspan="{len(pivot_filtrato.columns)+1}"></td></tr>'
-        last_group = prefix
-
-        html_code += f'<tr><td>{idx}</td>'
-        for col in pivot_filtrato.columns:
-                    # Se le colonne sono MultiIndex (data, turno)
-            if isinstance(col, tuple):
-                data = col[0]
-                turno = col[1]
-            else:
-                data = col
-                turno = ""
-
-            is_weekend = data.weekday() >= 5
-            is_holiday = data in giorni_festivi
-            classes = []
-            if data == oggi: classes.append("today-col")
-            if is_weekend:  classes.append("weekend-col")
-            if is_holiday:  classes.append("holiday-col")
-            if turno == "N": classes.append("day-separator")  # 🔹 anche nel corpo tabella
-            class_attr = " ".join(classes)
-
-            cell_value = row[col] if pd.notna(row[col]) else ""
-            # Tooltip ricco calcolato dai dati
-            tip_html = build_rich_tooltip_from_df(
-                df_source=df,
-                index_col=index_col,
-                idx_value=idx,
-                day_ts=data,
-                split_comma=split_comma
-            )
-            html_code += f'<td class="{class_attr} has-tip"><div class="tip-box">{tip_html}</div>{cell_value}</td>'
-        html_code += '</tr>'
+    # intestazioni, separatori tra gruppi di progetti e righe in un solo passaggio
+    html_code += corpo_tabella(pivot_filtrato, oggi, _indice_tooltip, separatori=True)
 
     ordine_first_col_js = f'const ordine_first_col = {ordine_first_col};' if ordine_first_col else 'const ordine_first_col = null;'
 
@@ -761,12 +1573,6 @@ def render_html_table_grouped(pivot_df, index_name, table_id, df_source, index_c
     <script>
     {ordine_first_col_js}
 
-    const pivotCompleto = `{pivot_df.to_html(escape=False, index=False)}`;  // pivot completo in HTML
-
-    function mostraTutto(){{
-        document.getElementById("{table_id}").innerHTML = pivotCompleto;
-    }}
-
     function vaiAdOggi() {{
       document.querySelectorAll(".table-wrapper").forEach(wrapper => {{
         const todayCell = wrapper.querySelector(".today-col");
@@ -851,19 +1657,31 @@ def render_html_table_grouped(pivot_df, index_name, table_id, df_source, index_c
     return html_code
 
 # TABELLA PER RIASSUNTO PROGETTI
-def build_pivot_progetti_colorati(df):
-    df_grouped = df.groupby(['ID_Progetto', 'Data_svolgimento']).apply(
-        lambda g: get_color_by_stato(g, progetto_id=g['ID_Progetto'].iloc[0])
-    ).reset_index(name='Colore')
+def celle_progetti_colorati(df, colori=None):
+    # un solo groupby per (progetto, giorno) + mappatura sulla tabella dei colori
+    df_grouped = (
+        (df['Stato'] == 'Da svolgere')
+        .groupby([df['ID_Progetto'], df['Data_svolgimento']], observed=True)
+        .any()
+        .reset_index(name='_rosso')
+    )
+    df_grouped['ID_Progetto'] = df_grouped['ID_Progetto'].astype(object)
+    df_grouped['Colore'] = colori_per_stato(df_grouped['ID_Progetto'], df_grouped['_rosso'], colori or {})
+    return df_grouped[['ID_Progetto', 'Data_svolgimento', 'Colore']]
+
+@profila
+def build_pivot_progetti_colorati(df, colori=None):
+    df_grouped = celle_progetti_colorati(df, colori)
 
-    all_dates = pd.date_range('2025-01-01', '2026-05-10', freq='D')
+    # pivot sparso: solo i giorni occupati
     pivot = df_grouped.pivot(
         index='ID_Progetto', columns='Data_svolgimento', values='Colore'
-    ).reindex(columns=all_dates, fill_value='')
+    )
 
     # 🔽 ottengo la data di inizio progetto
-    start_dates = get_project_start_dates(df)
+    return ordina_per_gruppo(pivot, get_project_start_dates(df))
 
+def ordina_per_gruppo(pivot, start_dates):
     # 🔽 calcolo il gruppo dei progetti (es primi 7 caratteri dell'ID)
     groups = pivot.index.to_series().apply(lambda x: str(x)[:7])
 
@@ -879,7 +1697,10 @@ def build_pivot_progetti_colorati(df):
     pivot = pivot.reindex(sort_df.index)
     return pivot
 
-def render_html_table_colored(pivot_df, index_name, table_id): # Per RIASSUNTO PROGETTI con gruppi
+@profila
+def render_html_table_colored(pivot_df, index_name, table_id, orizzonte=None): # Per RIASSUNTO PROGETTI con gruppi
+    oggi = pd.Timestamp.today().normalize()
+    pivot_df = espandi_colonne(pivot_df, *(orizzonte or limiti_pivot(pivot_df, oggi)))
     html_code = '''
     <style>
       .table-wrapper {
@@ -965,36 +1786,8 @@ def render_html_table_colored(pivot_df, index_name, table_id): # Per RIASSUNTO P
       <tr>
         <th>''' + index_name + '''</th>'''
 
-    for col in pivot_df.columns:
-        classes = []
-        if col == oggi: classes.append("today-col")
-        if col.weekday() >= 5: classes.append("weekend-col")
-        if col in giorni_festivi: classes.append("holiday-col")
-        class_attr = " ".join(classes)
-        html_code += f'<th class="{class_attr}">{col.strftime("%d/%m/%y")}</th>'
-    html_code += '</tr>'
-
-    last_group = None
-    for idx, row in pivot_df.iterrows():
-        # Prefisso progetto: primi 7 caratteri
-        prefix = str(idx)[:7]
-        if last_group is not None and prefix != last_group:
-            # riga separatore tra gruppi con attributo per escluderla dallo sorting
-            html_code += f'<tr style="height:5px; background:#aaa" data-separator="1"><td colspan="{len(pivot_df.columns)+1}"></td></tr>'
-        last_group = prefix
-
-        html_code += f'<tr><td>{idx}</td>'
-        for col in pivot_df.columns:
-            classes = []
-            if col == oggi: classes.append("today-col")
-            if col.weekday() >= 5: classes.append("weekend-col")
-            if col in giorni_festivi: classes.append("holiday-col")
-            class_attr = " ".join(classes)
-
-            colore = row[col] if row[col] else ""
-            style = f' style="background-color:{colore}"' if colore else ""
-            html_code += f'<td class="{class_attr}"{style}></td>'
-        html_code += '</tr>'
+    # celle colorate + separatori tra gruppi (primi 7 caratteri dell'ID)
+    html_code += corpo_tabella(pivot_df, oggi, separatori=True, colori=True, turno_in_testata=False)
 
     html_code += '''
     </table></div>
@@ -1013,23 +1806,24 @@ def render_html_table_colored(pivot_df, index_name, table_id): # Per RIASSUNTO P
 
 #TABELLA GANT PER TE
 
-def build_pivot(df, index_col, solo_id=False, split_comma=False):
+def celle_progetti(df, index_col, split_comma=False, assegnazioni=None, inizio=None, colori=None):
     df_to_group = df.copy()
     
     if split_comma:
-        df_to_group = df_to_group.assign(**{
-            index_col: df_to_group[index_col].str.split(',')
-        }).explode(index_col)
-        df_to_group[index_col] = df_to_group[index_col].str.strip()
+        # una riga per nome della lista, dalla tabella normalizzata (assegnazioni_te di df)
+        if assegnazioni is None:
+            assegnazioni = assegnazioni_te(df, index_col)
+        df_to_group = df.take(assegnazioni['_riga']).assign(**{index_col: assegnazioni[index_col].array})
     
-    df_grouped = df_to_group.groupby([index_col, 'Data_svolgimento', 'Turno']).apply(
-        lambda g: format_progetti(g, mostra_progetto=True, solo_id=solo_id)
-    ).reset_index(name='Progetti')
+    # senza inizio i progetti della cella restano in ordine di comparsa, senza colori
+    # ogni progetto prende get_color
+    return formatta_progetti(df_to_group, index_col, inizio or {}, colori or {})
 
+@profila
+def build_pivot(df, index_col, solo_id=False, split_comma=False, assegnazioni=None, inizio=None, colori=None):
+    df_grouped = celle_progetti(df, index_col, split_comma, assegnazioni, inizio, colori)
 
-
-    all_dates = pd.date_range('2025-01-01', '2026-05-10', freq='D')
-
+    # Pivot sparso: solo le colonne (data, turno) occupate, i giorni vuoti si aggiungono in render
     pivot = df_grouped.pivot_table(
         index=index_col, 
         columns=['Data_svolgimento', 'Turno'], 
@@ -1038,21 +1832,15 @@ def build_pivot(df, index_col, solo_id=False, split_comma=False):
         fill_value=''
     )
 
-        # Gestione Turno nullo: duplico in M e P
-    df_to_group['Turno'] = df_to_group['Turno'].fillna('M|P')
-    df_to_group = df_to_group.assign(
-        Turno=df_to_group['Turno'].str.split('|')
-    ).explode('Turno')
-    
-    # Riordina le colonne per data e turno
-    all_dates = pd.date_range('2025-01-01', '2026-05-10', freq='D')
-    turni = ['M','P','N']
-    multi_cols = pd.MultiIndex.from_product([all_dates, turni], names=['Data_svolgimento','Turno'])
-    pivot = pivot.reindex(columns=multi_cols, fill_value='')
-
     return pivot
 
-def render_html_table(pivot_df, index_name, table_id, df_source, index_col, split_comma=False, ordine_first_col=None):
+@profila
+def render_html_table(pivot_df, index_name, table_id, df_source, index_col, split_comma=False, ordine_first_col=None, _indice_tooltip=None, finestra=None):
+    oggi = pd.Timestamp.today().normalize()
+    # solo la finestra richiesta (default 10-30 giorni attorno ad oggi)
+    pivot_df = espandi_colonne(pivot_df, *(finestra or finestra_iniziale(oggi)))
+    if _indice_tooltip is None:
+        _indice_tooltip = build_tooltip_index(df_source, index_col, split_comma)
     html_code = f'''
     <style>
       .table-wrapper {{
@@ -1159,57 +1947,8 @@ def render_html_table(pivot_df, index_name, table_id, df_source, index_col, spli
       <tr>
         <th>{index_name}</th>'''
 
-    for col in pivot_df.columns:
-        # Se le colonne sono MultiIndex (data, turno)
-        if isinstance(col, tuple):
-            data = col[0]
-            turno = col[1]
-        else:
-            data = col
-            turno = ""
-
-        is_weekend = data.weekday() >= 5
-        is_holiday = data in giorni_festivi
-        classes = []
-        if data == oggi: classes.append("today-col")
-        if is_weekend:  classes.append("weekend-col")
-        if is_holiday:  classes.append("holiday-col")
-        class_attr = " ".join(classes)
-
-        html_code += f'<th class="{class_attr}">{data.strftime("%d/%m/%y")}<br>{turno}</th>'
-
-
-    for idx, row in pivot_df.iterrows():
-        html_code += f'<tr><td>{idx}</td>'
-        for col in pivot_df.columns:
-                    # Se le colonne sono MultiIndex (data, turno)
-            if isinstance(col, tuple):
-                data = col[0]
-                turno = col[1]
-            else:
-                data = col
-                turno = ""
-
-            is_weekend = data.weekday() >= 5
-            is_holiday = data in giorni_festivi
-            classes = []
-            if col == oggi: classes.append("today-col")
-            if is_weekend:  classes.append("weekend-col")
-            if is_holiday:  classes.append("holiday-col")
-            class_attr = " ".join(classes)
-
-            cell_value = row[col] if pd.notna(row[col]) else ""
-            # Tooltip ricco calcolato dai dati
-            tip_html = build_rich_tooltip_from_df(
-                df_source=df,
-                index_col=index_col,
-                idx_value=idx,
-                day_ts=data,
-                split_comma=split_comma
-            )
-            # Inserisco il tooltip come HTML reale (niente title/data-attr)
-            html_code += f'<td class="{class_attr} has-tip"><div class="tip-box">{tip_html}</div>{cell_value}</td>'
-        html_code += '</tr>'
+    # Tooltip ricco letto dall'indice precalcolato (niente bordo di fine giornata in questa tabella)
+    html_code += corpo_tabella(pivot_df, oggi, _indice_tooltip, separatore_turno=False)
 
     ordine_first_col_js = f'const ordine_first_col = {ordine_first_col};' if ordine_first_col else 'const ordine_first_col = null;'
 
@@ -1289,82 +2028,1257 @@ def render_html_table(pivot_df, index_name, table_id, df_source, index_col, spli
     '''
     return html_code
 
-# --- Costruzione e visualizzazione tabelle ---
+# --- Vista completa "Mostra tutto" (servita un blocco di giorni alla volta, su richiesta) ---
+GIORNI_BLOCCO = leggi_config("GANTT_GIORNI_BLOCCO", 31)
 
-# --- Costruzione pivot ---
-pivot_progetti = build_pivot_progetti_solo_scenario(df)
-pivot_piste = build_pivot(df, 'Pista', solo_id=True)
-pivot_te = build_pivot(df, 'TE', solo_id=True, split_comma=True)
-
-# --- Riga comandi in alto: Aggiorna dati, seleziona scheda, Vai ad oggi ---
-col1, col2 = st.columns([1, 3])
-
-with col1:
-    if st.button("Aggiorna dati", key="aggiorna_dati"):
-        st.cache_data.clear()
-        df = load_data()
-        st.rerun() # ricarica tutta la pagina
-with col2:
-    st.markdown("""
-        <style>
-        div[data-testid="stSelectbox"] > label {display:none;}
-        div[data-testid="stSelectbox"] {margin-top: -24px;}
-        </style>
-        """, unsafe_allow_html=True)
-    
-    scheda = st.selectbox(
-        "", 
-        ["Gantt Progetti", "Riassunto Progetti", "Gantt Piste", "Gantt TE", "Statistiche giornaliere"],
-        key="scheda_selezione"
-    )
+def blocchi_orizzonte(orizzonte, giorni_blocco=GIORNI_BLOCCO):
+    """Intervalli (inizio, fine) di giorni_blocco giorni che coprono l'orizzonte."""
+    inizi = pd.date_range(orizzonte[0], orizzonte[1], freq=f"{giorni_blocco}D")
+    return [(inizio, min(inizio + pd.Timedelta(days=giorni_blocco - 1), orizzonte[1])) for inizio in inizi]
 
-# SCHEDE
-    
-if scheda == "Gantt Progetti":
-    from streamlit.components.v1 import html as components_html
-    components_html(
-        render_html_table_grouped(pivot_progetti, "Progetto", "tableProgetti",
-                          df_source=df, index_col="ID_Progetto", split_comma=False),
-        height=900, scrolling=True
-    )
+def blocco_di_oggi(blocchi, oggi):
+    # il blocco che contiene oggi, altrimenti il primo
+    return next((k for k, (inizio, fine) in enumerate(blocchi) if inizio <= oggi <= fine), 0)
 
-elif scheda == "Gantt Piste":
-    from streamlit.components.v1 import html as components_html
-    components_html(
-        render_html_table_piste(
-            pivot_df=pivot_piste,
-            table_id="tablePiste",
-            df_source=df,
-            split_comma=False,
-            ordine_first_col=None  # opzionale
-        ),
-        height=900,
-        scrolling=True
+@profila
+def render_pivot_completo(pivot_df, index_name, table_id, orizzonte=None):
+    # Un blocco della vista completa: la pagina porta solo i giorni del blocco, gli altri
+    # vengono chiesti al server con i controlli del blocco (vedi controlli_blocchi)
+    oggi = pd.Timestamp.today().normalize()
+    parte = espandi_colonne(pivot_df, *(orizzonte or limiti_pivot(pivot_df, oggi)))
+    _, classi, intestazioni = metadati_colonne(parte.columns, oggi)
+    valori = parte.to_numpy(dtype=object)
+    righe = "".join(
+        f'<tr><td>{html.escape(str(idx))}</td>'
+        + "".join(f'<td class="{c}">{v}</td>' for c, v in zip(classi, riga))
+        + '</tr>'
+        for idx, riga in zip(parte.index, np.where(pd.isna(valori), "", valori))
     )
 
-elif scheda == "Gantt TE":
-    from streamlit.components.v1 import html as components_html
-    components_html(
-        render_html_table(pivot_te, "Test Engineer", "tableTE",
-                          df_source=df, index_col="TE", split_comma=True),
-        height=900, scrolling=True
+    return f'''
+    <style>
+      .table-wrapper {{
+        overflow: auto;
+        max-height: 700px;
+        border: 1px solid #ddd;
+        width: 100%;
+      }}
+      table {{ border-collapse: collapse; width: auto; }}
+      table tr:first-child th {{ position: sticky; top: 0; background: #f9f9f9; z-index: 5; }}
+      th, td {{
+        width: 140px;
+        max-width: 140px;
+        min-width: 140px;
+        border:1px solid #ddd;
+        padding:2px;
+        font-size: 9px;
+        font-family: "Segoe UI", Arial, sans-serif;
+        vertical-align: top;
+      }}
+      th.weekend-col, td.weekend-col, th.holiday-col, td.holiday-col {{
+        width: 15px !important;
+        max-width: 15px !important;
+        min-width: 15px !important;
+      }}
+      th:first-child, td:first-child {{
+        position: sticky;
+        left: 0;
+        background: #f9f9f9;
+        z-index: 2;
+        font-size: 12px;
+        width: 100px;
+        min-width: 100px;
+        max-width: 100px;
+        font-weight: bold;
+      }}
+      th:first-child {{ z-index: 6; }}
+      .today-col {{ background-color: #fff3cd !important; }}
+      .weekend-col {{ background-color: #e0e0e0 !important; }}
+      .holiday-col {{ background-color: #ffcccc !important; }}
+      .day-separator {{ border-right: 4px solid #333; }}
+      .btn-today {{
+        background: #007bff;
+        color: white;
+        padding: 6px 12px;
+        border: none;
+        margin-bottom: 8px;
+        cursor: pointer;
+        border-radius: 4px;
+      }}
+    </style>
+
+    <button class="btn-today" onclick="vaiAdOggi()">Vai ad oggi</button>
+
+    <div class="table-wrapper" id="{table_id}" tabindex="0">
+      <table><tr><th>{html.escape(index_name)}</th>{"".join(intestazioni)}</tr>{righe}</table>
+    </div>
+
+    <script>
+    const wrapper = document.getElementById("{table_id}");
+
+    function vaiAdOggi() {{
+      const todayCell = wrapper.querySelector(".today-col");
+      if (todayCell) {{
+        wrapper.scrollLeft = todayCell.offsetLeft - (wrapper.offsetWidth / 2) + (todayCell.offsetWidth / 2);
+      }}
+    }}
+
+    document.addEventListener("keydown", function(e) {{
+      const step = 80;
+      if (e.key === "ArrowRight") wrapper.scrollLeft += step;
+      if (e.key === "ArrowLeft")  wrapper.scrollLeft -= step;
+    }});
+    vaiAdOggi();
+    </script>
+    '''
+
+# --- Griglia virtuale: il pivot viaggia come JSON compatto e il browser disegna solo le celle visibili ---
+MODALITA_GANTT = leggi_config("GANTT_MODALITA_RENDER", "html")  # "html" oppure "virtuale"
+
+def griglia_json(pivot_df, inizio, fine, indice=None, separatori=False, colori=False):
+    """
+    Pivot -> dizionario compatto per la griglia virtuale: etichette di riga, giorni/turni di colonna,
+    celle sparse (riga, colonna, codice nella tabella dei valori) e tooltip sparsi per (riga, giorno).
+    """
+    oggi = pd.Timestamp.today().normalize()
+    parte = espandi_colonne(pivot_df, inizio, fine)
+    giorni = pd.date_range(inizio, fine, freq='D')
+    turni = TURNI if isinstance(parte.columns, pd.MultiIndex) else []
+
+    valori = parte.to_numpy(dtype=object)
+    righe, colonne = np.nonzero(pd.notna(valori) & (valori != ''))
+    codici, tabella = pd.factorize(valori[righe, colonne])
+
+    # altezza di riga stimata dalle righe di testo della cella più alta (i colori hanno altezza fissa)
+    altezze = np.full(len(parte.index), 20 if colori else 22)
+    if not colori and len(righe):
+        testo = pd.Series(tabella, dtype=object).astype(str)
+        linee = (testo.str.count('<div') + testo.str.count('<br')).clip(lower=1).to_numpy()[codici]
+        massime = pd.Series(linee).groupby(righe).max()
+        altezze[massime.index] = np.clip(massime.to_numpy() * 11 + 6, 22, 400)
+
+    etichette = [str(idx) for idx in parte.index]
+    tip = {"r": [], "d": [], "v": []}
+    if indice:
+        pos_riga = {e.strip(): i for i, e in enumerate(etichette)}
+        # lookup per cella visibile, senza scorrere l'indice: aggiorna_viste lo modifica sul posto
+        for chiave, r in pos_riga.items():
+            for d, giorno in enumerate(giorni):
+                tip_html = indice.get((chiave, giorno))
+                if tip_html is not None:
+                    tip["r"].append(r)
+                    tip["d"].append(d)
+                    tip["v"].append(tip_html)
+
+    return {
+        "etichette": etichette,
+        "giorni": [g.strftime("%d/%m/%y") for g in giorni],
+        "classi": [classi_colonna(g, "", oggi) for g in giorni],
+        "stretti": [g.weekday() >= 5 or g in giorni_festivi for g in giorni],
+        "turni": turni,
+        "oggi": giorni.get_loc(oggi) if oggi in giorni else -1,
+        "celle": {"r": righe.tolist(), "c": colonne.tolist(), "v": codici.tolist()},
+        "valori": [str(v) for v in tabella],
+        "tip": tip,
+        "sep": [i for i in range(1, len(etichette)) if etichette[i][:7] != etichette[i - 1][:7]] if separatori else [],
+        "altezze": altezze.tolist(),
+    }
+
+@profila
+def render_griglia_virtuale(pivot_df, index_name, table_id, intervallo, _indice_tooltip=None, separatori=False,
+                            ordina_oggi=False, colori=False, larghezze=(100, 140, 15)):
+    # larghezze = (prima colonna, cella, cella di weekend/festivo)
+    griglia = griglia_json(pivot_df, *intervallo, indice=_indice_tooltip, separatori=separatori, colori=colori)
+    griglia.update({
+        "titolo": index_name,
+        "colori": colori,
+        "ordinaOggi": ordina_oggi,
+        "larghezze": {"etichetta": larghezze[0], "cella": larghezze[1], "stretta": larghezze[2]},
+    })
+    payload = json.dumps(griglia, separators=(',', ':')).replace("</", "<\\/")
+    altezza_testata = 60 if colori else 28
+
+    return f'''
+    <style>
+      .griglia {{
+        display: grid;
+        grid-template-columns: {larghezze[0]}px 1fr;
+        grid-template-rows: {altezza_testata}px 700px;
+        border: 1px solid #ddd;
+        font-family: "Segoe UI", Arial, sans-serif;
+      }}
+      .pannello {{ position: relative; overflow: hidden; background: #fff; }}
+      .pannello.corpo {{ overflow: auto; outline: none; }}
+      .pannello.angolo, .pannello.testata, .pannello.etichette {{ background: #f9f9f9; }}
+      .vc {{
+        position: absolute;
+        box-sizing: border-box;
+        border: 1px solid #ddd;
+        padding: 2px;
+        font-size: 9px;
+        overflow: hidden;
+        word-break: break-word;
+        line-height: 1.2em;
+      }}
+      .corpo .vc {{ overflow: auto; }}
+      .testata .vc {{ cursor: pointer; text-align: center; }}
+      .testata.verticale .vc {{ writing-mode: vertical-rl; white-space: nowrap; text-align: left; }}
+      .etichette .vc, .angolo .vc {{ font-size: {10 if colori else 12}px; font-weight: bold; color: #004085; }}
+      .vc.sep {{ background: #aaa; border: none; }}
+      .today-col {{ background-color: #fff3cd !important; }}
+      .weekend-col {{ background-color: #e0e0e0 !important; }}
+      .holiday-col {{ background-color: #ffcccc !important; }}
+      .day-separator {{ border-right: 4px solid #333; }}
+      .tip-box {{
+        display: none;
+        position: fixed;
+        background: #333;
+        color: #fff;
+        padding: 8px 10px;
+        border-radius: 6px;
+        max-width: 800px;
+        font-size: 12px;
+        z-index: 50;
+        box-shadow: 0 4px 16px rgba(0,0,0,0.25);
+        white-space: nowrap;
+        pointer-events: none;
+      }}
+      .tt-proj {{ font-weight: 700; margin: 4px 0 2px; }}
+      .tt-row  {{ margin: 0 0 2px; }}
+      .btn-today {{
+        background: #007bff;
+        color: white;
+        padding: 6px 12px;
+        border: none;
+        margin-bottom: 8px;
+        cursor: pointer;
+        border-radius: 4px;
+      }}
+    </style>
+
+    <button class="btn-today" onclick="vaiAdOggi()">Vai ad oggi</button>
+
+    <div class="griglia" id="{table_id}">
+      <div class="pannello angolo"><div class="vc" style="left:0;top:0;width:100%;height:100%">{html.escape(index_name)}</div></div>
+      <div class="pannello testata{' verticale' if colori else ''}"><div class="strato"></div></div>
+      <div class="pannello etichette"><div class="strato"></div></div>
+      <div class="pannello corpo" tabindex="0"><div class="spazio"></div><div class="strato"></div></div>
+    </div>
+    <div class="tip-box" id="tip_{table_id}"></div>
+
+    <script type="application/json" id="dati_{table_id}">{payload}</script>
+    <script>
+    const G = JSON.parse(document.getElementById("dati_{table_id}").textContent);
+    const radice = document.getElementById("{table_id}");
+    const corpo = radice.querySelector(".corpo");
+    const testata = radice.querySelector(".testata .strato");
+    const etichette = radice.querySelector(".etichette .strato");
+    const strato = corpo.querySelector(".strato");
+    const tipBox = document.getElementById("tip_{table_id}");
+    const ALTEZZA_TESTATA = {altezza_testata}, SEPARATORE = 5, MARGINE = 300;
+
+    // --- geometria colonne (giorno x turno) ---
+    const nT = Math.max(G.turni.length, 1);
+    const nC = G.giorni.length * nT;
+    const xs = new Float64Array(nC + 1);
+    for (let c = 0; c < nC; c++) {{
+      const g = Math.floor(c / nT);
+      xs[c + 1] = xs[c] + (G.stretti[g] ? G.larghezze.stretta : G.larghezze.cella);
+    }}
+    function classeColonna(c) {{
+      const g = Math.floor(c / nT);
+      const sep = G.turni.length && G.turni[c % nT] === "N" ? " day-separator" : "";
+      return G.classi[g] + sep;
+    }}
+
+    // --- celle e tooltip sparsi, indicizzati per riga ---
+    const celle = G.etichette.map(() => new Map());
+    G.celle.r.forEach((r, i) => celle[r].set(G.celle.c[i], G.celle.v[i]));
+    const tips = new Map();
+    G.tip.r.forEach((r, i) => tips.set(r * G.giorni.length + G.tip.d[i], G.tip.v[i]));
+
+    // --- righe visibili nell'ordine corrente (con separatori di gruppo finché non si ordina) ---
+    let ordine = [], ys = new Float64Array(1);
+    function impostaOrdine(indici, conSeparatori) {{
+      const sep = new Set(conSeparatori ? G.sep : []);
+      ordine = [];
+      indici.forEach(r => {{ if (sep.has(r)) ordine.push(-1); ordine.push(r); }});
+      ys = new Float64Array(ordine.length + 1);
+      ordine.forEach((r, i) => ys[i + 1] = ys[i] + (r < 0 ? SEPARATORE : G.altezze[r]));
+      corpo.querySelector(".spazio").style.cssText = `width:${{xs[nC]}}px;height:${{ys[ordine.length]}}px`;
+      disegna();
+    }}
+
+    function cerca(arr, n, v) {{
+      let lo = 0, hi = n;
+      while (lo < hi) {{ const m = (lo + hi) >> 1; if (arr[m + 1] <= v) lo = m + 1; else hi = m; }}
+      return lo;
+    }}
+
+    let inAttesa = false;
+    function disegna() {{
+      inAttesa = false;
+      const x0 = corpo.scrollLeft, y0 = corpo.scrollTop;
+      const c0 = cerca(xs, nC, Math.max(0, x0 - MARGINE));
+      const c1 = cerca(xs, nC, x0 + corpo.clientWidth + MARGINE);
+      const i0 = cerca(ys, ordine.length, Math.max(0, y0 - MARGINE));
+      const i1 = cerca(ys, ordine.length, y0 + corpo.clientHeight + MARGINE);
+
+      let h = "", t = "", e = "";
+      for (let c = c0; c <= c1 && c < nC; c++) {{
+        const g = Math.floor(c / nT);
+        const turno = G.turni.length ? `<br>${{G.turni[c % nT]}}` : "";
+        t += `<div class="vc ${{classeColonna(c)}}" data-c="${{c}}" style="left:${{xs[c] - x0}}px;top:0;width:${{xs[c + 1] - xs[c]}}px;height:${{ALTEZZA_TESTATA}}px">${{G.giorni[g]}}${{turno}}</div>`;
+      }}
+      for (let i = i0; i <= i1 && i < ordine.length; i++) {{
+        const r = ordine[i], top = ys[i], alto = ys[i + 1] - ys[i];
+        if (r < 0) {{
+          h += `<div class="vc sep" style="left:${{xs[c0]}}px;top:${{top}}px;width:${{xs[Math.min(c1 + 1, nC)] - xs[c0]}}px;height:${{alto}}px"></div>`;
+          e += `<div class="vc sep" style="left:0;top:${{top - y0}}px;width:100%;height:${{alto}}px"></div>`;
+          continue;
+        }}
+        e += `<div class="vc" style="left:0;top:${{top - y0}}px;width:100%;height:${{alto}}px">${{G.etichette[r]}}</div>`;
+        for (let c = c0; c <= c1 && c < nC; c++) {{
+          const v = celle[r].get(c);
+          const contenuto = v === undefined || G.colori ? "" : G.valori[v];
+          const sfondo = v !== undefined && G.colori ? `background-color:${{G.valori[v]}};` : "";
+          h += `<div class="vc ${{classeColonna(c)}}" data-r="${{r}}" data-c="${{c}}" style="${{sfondo}}left:${{xs[c]}}px;top:${{top}}px;width:${{xs[c + 1] - xs[c]}}px;height:${{alto}}px">${{contenuto}}</div>`;
+        }}
+      }}
+      strato.innerHTML = h;
+      testata.innerHTML = t;
+      etichette.innerHTML = e;
+    }}
+
+    corpo.addEventListener("scroll", () => {{
+      if (!inAttesa) {{ inAttesa = true; requestAnimationFrame(disegna); }}
+    }});
+
+    // --- tooltip: un solo box, riempito al passaggio del mouse ---
+    strato.addEventListener("mouseover", ev => {{
+      const cella = ev.target.closest(".vc[data-r]");
+      const tip = cella && tips.get(+cella.dataset.r * G.giorni.length + Math.floor(+cella.dataset.c / nT));
+      if (!tip) {{ tipBox.style.display = "none"; return; }}
+      tipBox.innerHTML = tip;
+      const box = cella.getBoundingClientRect();
+      tipBox.style.left = `${{box.left + box.width / 2}}px`;
+      tipBox.style.top = `${{box.top + box.height / 2}}px`;
+      tipBox.style.display = "block";
+    }});
+    strato.addEventListener("mouseleave", () => tipBox.style.display = "none");
+
+    // --- ordinamento per colonna (celle vuote in fondo) ---
+    let colonnaOrdinata = null, crescente = true;
+    function testoCella(r, c) {{
+      const v = celle[r].get(c);
+      return v === undefined ? "" : G.valori[v].replace(/<[^>]*>/g, "").trim().toLowerCase();
+    }}
+    function ordinaColonna(c) {{
+      crescente = colonnaOrdinata !== c || !crescente;
+      colonnaOrdinata = c;
+      const indici = G.etichette.map((_, r) => r);
+      indici.sort((a, b) => {{
+        const A = testoCella(a, c), B = testoCella(b, c);
+        if (A === "" && B !== "") return 1;
+        if (A !== "" && B === "") return -1;
+        if (A === "" && B === "") return 0;
+        return crescente ? A.localeCompare(B) : B.localeCompare(A);
+      }});
+      impostaOrdine(indici, false);
+    }}
+    testata.addEventListener("click", ev => {{
+      const cella = ev.target.closest(".vc[data-c]");
+      if (cella && !G.colori) ordinaColonna(+cella.dataset.c);
+    }});
+
+    function vaiAdOggi() {{
+      if (G.oggi < 0) return;
+      const c = G.oggi * nT;
+      corpo.scrollLeft = xs[c] - corpo.clientWidth / 2 + (xs[c + 1] - xs[c]) / 2;
+    }}
+
+    document.addEventListener("keydown", function(e) {{
+      const step = 80;
+      if (e.key === "ArrowRight") corpo.scrollLeft += step;
+      if (e.key === "ArrowLeft")  corpo.scrollLeft -= step;
+    }});
+
+    impostaOrdine(G.etichette.map((_, r) => r), true);
+    if (G.ordinaOggi && G.oggi >= 0) ordinaColonna(G.oggi * nT);
+    vaiAdOggi();
+    </script>
+    '''
+
+# --- Statistiche giornaliere: metriche vettoriali per giorno, settimana o mese ---
+# Un solo passaggio sull'intero frame produce poche tabelle per giorno (run per turno,
+# presenze di progetti, piste e TE); settimane e mesi si aggregano da queste e i grafici
+# leggono solo i frame aggregati, mai le run.
+GRANULARITA = {"Giorno": "D", "Settimana": "W", "Mese": "M"}  # settimane da lunedì
+TURNO_NON_INDICATO = "n.d."
+
+def giorni_lavorativi(giorni):
+    # come nelle colonne del Gantt: sabato, domenica e giorni_festivi non sono lavorativi
+    giorni = pd.DatetimeIndex(giorni)
+    return (giorni.weekday < 5) & ~giorni.isin(list(giorni_festivi))
+
+def inizio_periodo(giorni, granularita):
+    return pd.DatetimeIndex(giorni).to_period(GRANULARITA[granularita]).start_time
+
+@profila
+def tabelle_giornaliere(df, assegnazioni):
+    """
+    Tabelle per giorno da cui derivano tutte le statistiche (assegnazioni = assegnazioni_te(df)):
+      run       [giorno, Turno, run, da_svolgere]   Turno nullo -> TURNO_NON_INDICATO
+      progetti  [giorno, ID_Progetto]                progetti con almeno una run nel giorno
+      piste     [giorno, Pista]                      piste occupate nel giorno
+      te        [giorno, TE]                         TE impegnati nel giorno
+    """
+    d = df[df['Data_svolgimento'].notna()]
+    giorno = d['Data_svolgimento'].dt.normalize()
+    run = (
+        pd.DataFrame({'giorno': giorno, 'Turno': riempi(d['Turno'], TURNO_NON_INDICATO),
+                      '_rosso': d['Stato'] == 'Da svolgere'})
+          .groupby(['giorno', 'Turno'], observed=True)['_rosso']
+          .agg(run='size', da_svolgere='sum')
+          .reset_index()
     )
+    a = assegnazioni[assegnazioni['Data_svolgimento'].notna()]
+    return {
+        'run': run,
+        'progetti': pd.DataFrame({'giorno': giorno, 'ID_Progetto': d['ID_Progetto']}).drop_duplicates(ignore_index=True),
+        'piste': pd.DataFrame({'giorno': giorno, 'Pista': d['Pista']}).drop_duplicates(ignore_index=True),
+        'te': pd.DataFrame({'giorno': a['Data_svolgimento'].dt.normalize(), 'TE': a['TE']}).drop_duplicates(ignore_index=True),
+    }
 
-elif scheda == "Riassunto Progetti":
-    pivot_progetti_colorati = build_pivot_progetti_colorati(df)
-    from streamlit.components.v1 import html as components_html
-    components_html(
-        render_html_table_colored(pivot_progetti_colorati, "Progetto", "tableProgettiColorati"),
-        height=900, scrolling=True
+@profila
+def aggrega_statistiche(tabelle, granularita):
+    """
+    Metriche per periodo dalle tabelle giornaliere, None se non ci sono run con data:
+      run        [periodo, Turno, run]
+      riepilogo  [periodo, run, da_svolgere, quota_da_svolgere, progetti_attivi]
+      piste      [periodo, Pista, giorni, utilizzo]
+      te         [periodo, TE, giorni, utilizzo]
+    L'utilizzo è la quota dei giorni lavorativi del periodo con almeno una run.
+    """
+    run = tabelle['run']
+    if run.empty:
+        return None
+    run = run.assign(periodo=inizio_periodo(run['giorno'], granularita))
+    per_turno = run.groupby(['periodo', 'Turno'], observed=True, as_index=False)['run'].sum()
+    riepilogo = run.groupby('periodo')[['run', 'da_svolgere']].sum()
+    riepilogo['quota_da_svolgere'] = riepilogo['da_svolgere'] / riepilogo['run']
+    progetti = tabelle['progetti']
+    # come per piste e TE: una run senza progetto non è un progetto attivo
+    progetti = progetti[~progetti['ID_Progetto'].isin(VALORI_VUOTI)]
+    riepilogo['progetti_attivi'] = (
+        progetti.assign(periodo=inizio_periodo(progetti['giorno'], granularita))
+                .drop_duplicates(['periodo', 'ID_Progetto'])
+                .groupby('periodo').size()
     )
+    riepilogo = riepilogo.fillna({'progetti_attivi': 0}).astype({'progetti_attivi': int}).reset_index()
+
+    # giorni lavorativi dei periodi interi (anche dove i dati iniziano o finiscono a metà)
+    primo = inizio_periodo([run['giorno'].min()], granularita)[0]
+    ultimo = pd.DatetimeIndex([run['giorno'].max()]).to_period(GRANULARITA[granularita]).end_time[0].normalize()
+    calendario = pd.date_range(primo, ultimo)
+    disponibili = pd.Series(giorni_lavorativi(calendario), index=calendario).groupby(
+        inizio_periodo(calendario, granularita)).sum()
+
+    def utilizzo(presenze, colonna):
+        tenute = giorni_lavorativi(presenze['giorno']) & ~presenze[colonna].isin(VALORI_VUOTI).to_numpy()
+        p = presenze[tenute]
+        giorni = (
+            p.assign(periodo=inizio_periodo(p['giorno'], granularita))
+             .groupby(['periodo', colonna], observed=True)
+             .size()
+             .rename('giorni')
+             .reset_index()
+        )
+        giorni[colonna] = giorni[colonna].astype(str)
+        giorni['utilizzo'] = giorni['giorni'] / disponibili.reindex(giorni['periodo']).to_numpy()
+        return giorni
+
+    per_turno['Turno'] = per_turno['Turno'].astype(str)
+    return {
+        'run': per_turno,
+        'riepilogo': riepilogo,
+        'piste': utilizzo(tabelle['piste'], 'Pista'),
+        'te': utilizzo(tabelle['te'], 'TE'),
+    }
+
+@cache_scope("pivot")
+def statistiche_giornaliere(versione, _df):
+    # tabelle per giorno della versione dei dati, condivise dalle tre granularità
+    return tabelle_giornaliere(_df, tabella_te(versione, _df))
+
+@cache_scope("pivot")
+def statistiche(granularita, versione, _df):
+    return aggrega_statistiche(statistiche_giornaliere(versione, _df), granularita)
+
+def grafici_statistiche(stat, granularita):
+    """Grafici Altair delle statistiche, costruiti sui soli frame aggregati."""
+    unita = "yearmonth" if granularita == "Mese" else "yearmonthdate"
+    formato = "%m/%Y" if granularita == "Mese" else "%d/%m/%y"
+    x = alt.X("periodo:T", title=None, axis=alt.Axis(format=formato))
+    x_celle = alt.X(f"{unita}(periodo):O", title=None, axis=alt.Axis(format=formato, labelOverlap=True))
+    tooltip_periodo = alt.Tooltip("periodo:T", title="Periodo", format=formato)
+    return {
+        "run": alt.Chart(stat["run"], title="Run per turno").mark_bar().encode(
+            x=x, y=alt.Y("run:Q", title="Run"), color=alt.Color("Turno:N"),
+            tooltip=[tooltip_periodo, "Turno:N", alt.Tooltip("run:Q", title="Run")],
+        ),
+        "da_svolgere": alt.Chart(stat["riepilogo"], title="Quota di run \"Da svolgere\"").mark_line(point=True).encode(
+            x=x, y=alt.Y("quota_da_svolgere:Q", title=None, axis=alt.Axis(format="%")),
+            tooltip=[tooltip_periodo, alt.Tooltip("quota_da_svolgere:Q", title="Da svolgere", format=".1%"),
+                     alt.Tooltip("da_svolgere:Q", title="Run da svolgere"), alt.Tooltip("run:Q", title="Run")],
+        ),
+        "progetti": alt.Chart(stat["riepilogo"], title="Progetti attivi").mark_line(point=True).encode(
+            x=x, y=alt.Y("progetti_attivi:Q", title=None),
+            tooltip=[tooltip_periodo, alt.Tooltip("progetti_attivi:Q", title="Progetti attivi")],
+        ),
+        "piste": alt.Chart(stat["piste"], title="Utilizzo delle piste (giorni lavorativi con run)").mark_rect().encode(
+            x=x_celle, y=alt.Y("Pista:N", title=None),
+            color=alt.Color("utilizzo:Q", title="Utilizzo", scale=alt.Scale(domain=[0, 1]), legend=alt.Legend(format="%")),
+            tooltip=[tooltip_periodo, "Pista:N", alt.Tooltip("utilizzo:Q", title="Utilizzo", format=".0%"),
+                     alt.Tooltip("giorni:Q", title="Giorni con run")],
+        ),
+        "te": alt.Chart(stat["te"], title="Utilizzo dei TE (giorni lavorativi con run)").mark_rect().encode(
+            x=x_celle, y=alt.Y("TE:N", title=None),
+            color=alt.Color("utilizzo:Q", title="Utilizzo", scale=alt.Scale(domain=[0, 1]), legend=alt.Legend(format="%")),
+            tooltip=[tooltip_periodo, "TE:N", alt.Tooltip("utilizzo:Q", title="Utilizzo", format=".0%"),
+                     alt.Tooltip("giorni:Q", title="Giorni con run")],
+        ),
+    }
 
-elif scheda == "Statistiche giornaliere":
+# --- Costruzione e visualizzazione tabelle ---
 
+# --- Costruzione pivot (solo per la scheda attiva) ---
+# inizio (date di inizio dei progetti) e colori (tabella colori) della versione dei dati
+# arrivano come argomenti: il refresher costruisce la versione successiva mentre i rerun
+# usano ancora quella corrente
+COSTRUTTORI_PIVOT = {
+    "Gantt Progetti": lambda d, inizio, colori, te=None: build_pivot_progetti_solo_scenario(d),
+    "Gantt Piste": lambda d, inizio, colori, te=None: build_pivot(d, 'Pista', solo_id=True,
+                                                                  inizio=inizio, colori=colori),
+    "Gantt TE": lambda d, inizio, colori, te=None: build_pivot(d, 'TE', solo_id=True, split_comma=True,
+                                                               assegnazioni=te, inizio=inizio, colori=colori),
+    "Riassunto Progetti": lambda d, inizio, colori, te=None: build_pivot_progetti_colorati(d, colori),
+}
 
+@cache_scope("pivot")
+def pivot_scheda(scheda, versione, _df, _inizio, _colori):
+    # chiave = (scheda, versione dati): DataFrame, date di inizio e colori (determinati dalla
+    # versione) non vengono hashati ad ogni rerun
+    aggiornato = vista_registrata(("pivot", scheda), versione)
+    if aggiornato is not None:
+        return aggiornato[1]  # già aggiornato in modo incrementale dal refresher
+    pivot = None
+    if ARTEFATTI_DIR:
+        pivot = pivot_precalcolato(scheda, firma_dati(versione, _df))
+    if pivot is None:
+        if scheda == "Gantt TE":
+            pivot = COSTRUTTORI_PIVOT[scheda](_df.copy(), _inizio, _colori, tabella_te(versione, _df))
+        else:
+            pivot = COSTRUTTORI_PIVOT[scheda](_df.copy(), _inizio, _colori)
+    registra_vista(("pivot", scheda), versione, pivot)
+    return pivot
+
+# --- Aggiornamento incrementale delle viste: solo le celle toccate dalle run cambiate ---
+# Una cella (chiave, giorno, turno) dipende solo dalle run che vi cadono: le celle delle run
+# cambiate (prima e dopo la modifica) vengono ricalcolate con gli stessi costruttori sulle
+# sole run di quelle celle (split dei TE e Turno nullo in M e P compresi), il resto del
+# pivot resta quello precedente.
+PATCH_MAX_RIGHE = leggi_config("GANTT_PATCH_MAX_RIGHE", 2000)  # oltre, ricostruzione completa
+
+# colonna indice di ogni vista, split per virgola e turno delle colonne: None = colonne per
+# giorno, "" = Turno obbligatorio per avere una cella, "M|P" = il Turno nullo vale per M e P
+CELLE_VISTE = {
+    "Gantt Progetti": ("ID_Progetto", False, "M|P"),
+    "Gantt Piste": ("Pista", False, ""),
+    "Gantt TE": ("TE", True, ""),
+    "Riassunto Progetti": ("ID_Progetto", False, None),
+}
+
+# celle di ogni vista come le formatta il suo costruttore, prima del pivot: un frame
+# [chiave, giorno, (turno), valore] con una riga per cella occupata
+CELLE_COSTRUTTORI = {
+    "Gantt Progetti": lambda d, inizio, colori, te=None: celle_progetti_solo_scenario(d),
+    "Gantt Piste": lambda d, inizio, colori, te=None: celle_progetti(d, 'Pista', inizio=inizio, colori=colori),
+    "Gantt TE": lambda d, inizio, colori, te=None: celle_progetti(d, 'TE', split_comma=True, assegnazioni=te,
+                                                                    inizio=inizio, colori=colori),
+    "Riassunto Progetti": lambda d, inizio, colori, te=None: celle_progetti_colorati(d, colori),
+}
 
+@st.cache_resource
+def viste_correnti():
+    # ultima versione costruita di ogni pivot, indice dei tooltip e tabella colori
+    return {"voci": {}, "lock": threading.Lock()}
+
+def registra_vista(chiave, versione, valore, extra=None):
+    if "|" in str(versione):
+        return  # viste filtrate (versione_filtrata): non fanno da base agli aggiornamenti incrementali
+    registro = viste_correnti()
+    with registro["lock"]:
+        registro["voci"][chiave] = (versione, valore, extra)
+
+def vista_registrata(chiave, versione):
+    """(versione, valore, extra) se l'ultima vista registrata per chiave è della versione indicata."""
+    registro = viste_correnti()
+    with registro["lock"]:
+        voce = registro["voci"].get(chiave)
+    return voce if voce is not None and voce[0] == versione else None
+
+def celle_run(df, index_col, split_comma=False, assegnazioni=None):
+    """
+    Celle in cui cade ogni run di df: una riga per (run, cella) con chiave, giorno, turno
+    (NaN se nullo, vedi turni_vista) e posizione della run in df (_riga). Con split_comma le
+    chiavi vengono da assegnazioni (assegnazioni_te di df, calcolata se manca).
+    """
+    if split_comma:
+        if assegnazioni is None:
+            assegnazioni = assegnazioni_te(compatta(df[['Data_svolgimento', 'Turno', index_col]]), index_col)
+        a = assegnazioni
+        chiavi, giorni, turni, righe = a[index_col], a['Data_svolgimento'], a['Turno'], a['_riga'].to_numpy()
+    else:
+        chiavi, giorni, turni, righe = df[index_col], df['Data_svolgimento'], df['Turno'], np.arange(len(df))
+    celle = pd.DataFrame({
+        'chiave': np.asarray(chiavi.astype(object)),
+        'giorno': np.asarray(giorni),
+        'turno': np.asarray(turni.astype(object)),
+        '_riga': righe,
+    })
+    return celle[celle['chiave'].notna() & celle['giorno'].notna()]
+
+def turni_vista(celle, turno):
+    # celle con il turno della vista (CELLE_VISTE)
+    if turno is None:
+        return celle.drop(columns='turno')
+    nulli = celle['turno'].isna()
+    if not turno:
+        return celle[~nulli]
+    return pd.concat([celle[~nulli], *(celle[nulli].assign(turno=t) for t in turno.split('|'))],
+                     ignore_index=True)
+
+def indice_celle(celle):
+    # celle distinte come MultiIndex (chiave, giorno[, turno])
+    return pd.MultiIndex.from_frame(celle.drop(columns='_riga')).unique()
+
+def colonne_celle(celle):
+    # colonna del pivot di ogni cella: (giorno, turno) oppure giorno
+    return celle.droplevel(0) if celle.nlevels > 2 else celle.get_level_values(1)
+
+def compatta(df):
+    # poche run: solo le loro categorie, costruttori e split dei TE lavorano per categoria distinta
+    return df.assign(**{c: df[c].cat.remove_unused_categories()
+                        for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+
+def con_chiavi(valori, chiavi, split_comma=False):
+    # maschera delle run con una delle chiavi (con split_comma: un nome della lista)
+    if split_comma:
+        nomi = set(chiavi)
+        distinti = valori.cat.categories if isinstance(valori.dtype, pd.CategoricalDtype) else valori.dropna().unique()
+        chiavi = [v for v in distinti if any(n.strip() in nomi for n in str(v).split(','))]
+    return valori.isin(list(chiavi)).to_numpy()
+
+def run_nelle_celle(df, coppie, index_col, split_comma=False):
+    """
+    Run di df (nel loro ordine, categorie compattate) che cadono in almeno una delle coppie
+    (chiave, giorno), con le loro celle (celle_run) e, con split_comma, le loro assegnazioni.
+    """
+    sotto = df[df['Data_svolgimento'].isin(coppie.get_level_values(1).unique()).to_numpy()]
+    # chiavi cercate solo tra quelle dei giorni scelti: con split_comma si dividono meno liste
+    sotto = compatta(sotto[con_chiavi(compatta(sotto[[index_col]])[index_col], coppie.get_level_values(0).unique(), split_comma)])
+    te = assegnazioni_te(sotto, index_col) if split_comma else None
+    proprie = celle_run(sotto, index_col, split_comma, te)
+    dentro = pd.MultiIndex.from_frame(proprie[['chiave', 'giorno']]).isin(coppie)
+    if dentro.all():
+        return sotto, proprie, te
+    sotto = compatta(sotto.iloc[np.unique(proprie['_riga'].to_numpy()[dentro])])
+    te = assegnazioni_te(sotto, index_col) if split_comma else None
+    return sotto, celle_run(sotto, index_col, split_comma, te), te
+
+def celle_occupate(df, index_col, split_comma, turno, chiavi=(), giorni=()):
+    """Celle delle run di df con una delle chiavi o in uno dei giorni: chi è rimasto senza celle sparisce."""
+    scelte = con_chiavi(df[index_col], chiavi, split_comma) | df['Data_svolgimento'].isin(list(giorni)).to_numpy()
+    return indice_celle(turni_vista(celle_run(df[scelte], index_col, split_comma), turno))
+
+def valori_celle(costruite):
+    # valore (ultima colonna) di ogni cella costruita da CELLE_COSTRUTTORI, indicizzato per cella
+    chiavi = [costruite[c].astype(object) if isinstance(costruite[c].dtype, pd.CategoricalDtype) else costruite[c]
+              for c in costruite.columns[:-1]]
+    return pd.Series(costruite.iloc[:, -1].to_numpy(dtype=object), index=pd.MultiIndex.from_arrays(chiavi))
+
+def aggiorna_celle(pivot, valori, celle, vuoto):
+    """
+    Pivot con le celle indicate prese da valori (valori_celle) o svuotate se non vi
+    compaiono, più le righe e le colonne delle celle nuove. Restituisce anche le righe e
+    le colonne rimaste tutte vuote tra quelle delle celle svuotate: una cella vera può
+    essere vuota (run senza progetto), vanno verificate sui dati.
+    """
+    posizioni = valori.index.get_indexer(celle) if valori is not None else np.full(len(celle), -1)
+    presente = posizioni >= 0
+    presenti = celle[presente]
+    nuove_righe = presenti.get_level_values(0).unique().difference(pivot.index)
+    nuove_colonne = colonne_celle(presenti).unique().difference(pivot.columns)
+    if len(nuove_righe) or len(nuove_colonne):
+        righe, colonne = pivot.index.union(nuove_righe), pivot.columns.union(nuove_colonne)
+        tabella = np.full((len(righe), len(colonne)), vuoto, dtype=object)
+        tabella[np.ix_(righe.get_indexer(pivot.index), colonne.get_indexer(pivot.columns))] = pivot.to_numpy(dtype=object)
+    else:
+        righe, colonne = pivot.index, pivot.columns
+        tabella = pivot.to_numpy(dtype=object, copy=True)  # la versione precedente resta a chi la sta leggendo
+
+    nuovi = np.full(len(celle), vuoto, dtype=object)
+    if presente.any():
+        nuovi[presente] = valori.to_numpy()[posizioni[presente]]
+    r, c = righe.get_indexer(celle.get_level_values(0)), colonne.get_indexer(colonne_celle(celle))
+    dentro = (r >= 0) & (c >= 0)
+    tabella[r[dentro], c[dentro]] = nuovi[dentro]
+
+    unito = pd.DataFrame(tabella, index=righe, columns=colonne, dtype=object)  # dtype: niente inferenza per colonna
+    unito.index.name, unito.columns.names = pivot.index.name, pivot.columns.names
+    # righe e colonne delle celle svuotate, guardando solo quelle e non l'intero pivot
+    svuotate = celle[~presente]
+    righe_vuote = righe.intersection(svuotate.get_level_values(0)).difference(presenti.get_level_values(0))
+    parte = tabella[righe.get_indexer(righe_vuote)]
+    righe_vuote = righe_vuote[(pd.isna(parte) | (parte == '')).all(axis=1)]
+    colonne_vuote = colonne.intersection(colonne_celle(svuotate)).difference(colonne_celle(presenti))
+    parte = tabella[:, colonne.get_indexer(colonne_vuote)]
+    colonne_vuote = colonne_vuote[(pd.isna(parte) | (parte == '')).all(axis=0)]
+    return unito, righe_vuote, colonne_vuote
+
+def aggiorna_viste(df, versione, modifica, inizio):
+    """
+    Prepara pivot, indici dei tooltip e tabella colori della nuova versione a partire
+    da quelli della versione modifica["da"], ricalcolando solo le celle delle run
+    modifica["ids"] (inserite, modificate o cancellate; modifica["precedente"] è il frame
+    precedente). df e inizio sono il frame e le date di inizio nuovi (prepara_dati);
+    la tabella colori nuova viene registrata qui. Le viste senza base restano da costruire.
+    """
+    precedente, ids = modifica["precedente"], modifica["ids"]
+    if len(ids) > PATCH_MAX_RIGHE:
+        return
+    vecchie = precedente[precedente[SYNC_ID_COL].isin(ids)]
+    nuove = df[df[SYNC_ID_COL].isin(ids)]
+    toccate = pd.concat([vecchie, nuove])
+    progetti = toccate['ID_Progetto'].dropna().astype(object).unique()
+
+    base = vista_registrata(("colori",), modifica["da"])
+    if base is not None:
+        colori = dict(base[1])
+        colori.update({str(p): get_color(p) for p in progetti if str(p) not in colori})
+        registra_vista(("colori",), versione, colori)
+    colori = tabella_colori(versione, df)
+
+    # Piste e TE ordinano i progetti nella cella per data di inizio: se cambia, cambiano
+    # tutte le celle del progetto
+    prima = per_progetto(precedente[precedente['ID_Progetto'].isin(progetti)]
+                         .dropna(subset=['Data_svolgimento']))
+    spostati = [p for p in progetti if inizio.get(str(p)) != prima.get(p)]
+    run_spostati = df[df['ID_Progetto'].isin(spostati)]
+
+    # run delle celle toccate, scelte una volta per colonna indice: tooltip e pivot della
+    # stessa colonna le condividono (una cella con turno cade nella sua coppia chiave, giorno)
+    griglie = {(g[0], g[1]) for g in GRIGLIE_VIRTUALI.values() if g[0]}
+    colonne = {g for g in griglie if vista_registrata(("tooltip", *g), modifica["da"]) is not None}
+    colonne |= {CELLE_VISTE[s][:2] for s in CELLE_COSTRUTTORI if vista_registrata(("pivot", s), modifica["da"]) is not None}
+    scelte = {}
+    for index_col, split_comma in colonne:
+        cambiate = pd.concat([celle_run(vecchie, index_col, split_comma), celle_run(nuove, index_col, split_comma)])
+        spostate = celle_run(run_spostati, index_col, split_comma) if index_col != "ID_Progetto" else cambiate[:0]
+        coppie = indice_celle(pd.concat([cambiate, spostate]).drop(columns='turno'))
+        scelte[(index_col, split_comma)] = (cambiate, spostate, *run_nelle_celle(df, coppie, index_col, split_comma))
+
+    for index_col, split_comma in griglie:
+        base = vista_registrata(("tooltip", index_col, split_comma), modifica["da"])
+        if base is None:
+            continue
+        cambiate, spostate, sotto, proprie, te = scelte[(index_col, split_comma)]
+        celle = indice_celle(cambiate.drop(columns='turno'))
+        if not spostate.empty:
+            # le celle dei progetti spostati servono solo a Piste e TE
+            dentro = pd.MultiIndex.from_frame(proprie[['chiave', 'giorno']]).isin(celle)
+            sotto, te = sotto.iloc[np.unique(proprie['_riga'].to_numpy()[dentro])], None
+        ricalcolati = build_tooltip_index(sotto, index_col, split_comma, te)
+        # sul posto, senza copiare l'indice: i lettori fanno solo lookup per cella (corpo_tabella,
+        # griglia_json) e al più vedono già il tooltip nuovo di una cella della versione precedente
+        indice = base[1]
+        for cella in celle:
+            if cella in ricalcolati:
+                indice[cella] = ricalcolati[cella]
+            else:
+                indice.pop(cella, None)
+        registra_vista(("tooltip", index_col, split_comma), versione, indice)
 
+    for scheda in CELLE_COSTRUTTORI:
+        base = vista_registrata(("pivot", scheda), modifica["da"])
+        if base is None:
+            continue
+        index_col, split_comma, turno = CELLE_VISTE[scheda]
+        extra = None
+        cambiate, spostate, sotto, _, te = scelte[(index_col, split_comma)]
+        if scheda == "Riassunto Progetti":
+            # ordine delle righe: date di inizio dai Setup, tenute aggiornate progetto per progetto
+            extra = inizi_da_setup(precedente) if base[2] is None else base[2]
+            extra = pd.concat([
+                extra.drop(progetti, errors='ignore'),
+                inizi_da_setup(df[df['ID_Progetto'].isin(progetti)]),
+            ]).sort_index()
+            if extra.empty:
+                continue  # nessun Setup: get_project_start_dates ripiega su tutte le date
+        celle = indice_celle(turni_vista(pd.concat([cambiate, spostate]), turno))
+        valori = valori_celle(CELLE_COSTRUTTORI[scheda](sotto, inizio, colori, te)) if not sotto.empty else None
+        # valori del Riassunto = colori con NaN per le celle vuote, altrove stringhe con ''
+        vuoto = np.nan if scheda == "Riassunto Progetti" else ''
+        pivot, righe_vuote, colonne_vuote = aggiorna_celle(base[1], valori, celle, vuoto)
+        if len(righe_vuote) or len(colonne_vuote):
+            # come in una ricostruzione completa, sparisce solo chi non ha più celle nei dati
+            occupate = celle_occupate(df, index_col, split_comma, turno, righe_vuote, colonne_vuote.get_level_values(0))
+            pivot = pivot.drop(index=righe_vuote.difference(occupate.get_level_values(0)),
+                               columns=colonne_vuote.difference(colonne_celle(occupate)))
+        if scheda == "Riassunto Progetti":
+            # righe solo NaN: le aggiunge ordina_per_gruppo per i progetti con data di inizio
+            senza_celle = pivot.index.intersection(progetti)
+            senza_celle = senza_celle[pivot.loc[senza_celle].isna().all(axis=1).to_numpy()]
+            pivot = ordina_per_gruppo(pivot.drop(index=senza_celle), extra)
+        registra_vista(("pivot", scheda), versione, pivot, extra)
+
+# --- Artefatti precalcolati (precalcola.py): pivot e pagine costruiti fuori dall'app ---
+ARTEFATTI_DIR = leggi_config("GANTT_ARTEFATTI_DIR", "")  # "" = l'app costruisce tutto da sé
+ARTEFATTI_FORMATO = 2  # 2: pivot in Parquet (mai pickle: la cartella non deve poter eseguire codice nell'app)
+ARTEFATTI_MANIFEST = "manifest.json"
+ARTEFATTI_CHIAVE_META = b"gantt_pivot"
+
+def file_scheda(scheda):
+    return scheda.lower().replace(" ", "_")
+
+def salva_pivot(pivot, percorso):
+    """
+    Scrive un pivot in Parquet. Parquet vuole nomi di colonna testuali: le colonne (data, turno)
+    o data diventano "AAAA-MM-GG|turno" o "AAAA-MM-GG" e i nomi dei livelli vanno nei metadati.
+    """
+    livelli = list(pivot.columns.names)
+    nomi = [f"{c[0]:%Y-%m-%d}|{c[1]}" if isinstance(c, tuple) else f"{c:%Y-%m-%d}" for c in pivot.columns]
+    tabella = pa.Table.from_pandas(pivot.set_axis(nomi, axis=1), preserve_index=True)
+    tabella = tabella.replace_schema_metadata({
+        **(tabella.schema.metadata or {}),
+        ARTEFATTI_CHIAVE_META: json.dumps({"livelli": livelli}).encode(),
+    })
+    pq.write_table(tabella, percorso)
+
+def leggi_pivot(percorso):
+    """Pivot scritto da salva_pivot, con le colonne di nuovo date (e turni)."""
+    tabella = pq.read_table(percorso)
+    livelli = json.loads(tabella.schema.metadata[ARTEFATTI_CHIAVE_META])["livelli"]
+    pivot = tabella.to_pandas()
+    parti = [nome.split("|", 1) for nome in pivot.columns]
+    giorni = pd.to_datetime([p[0] for p in parti])
+    if len(livelli) == 2:
+        colonne = pd.MultiIndex.from_arrays([giorni, [p[1] for p in parti]], names=livelli)
+    else:
+        colonne = pd.DatetimeIndex(giorni, name=livelli[0])
+    return pivot.set_axis(colonne, axis=1)
+
+@cache_scope("pivot")
+def firma_dati(versione, _df):
+    # identifica i dati indipendentemente dal processo che li ha caricati
+    return {"hwm": calcola_hwm(_df), "righe": len(_df)}
+
+def manifest_artefatti(firma, cartella=None):
+    """Manifest della cartella se gli artefatti vengono dagli stessi dati (hwm e righe), altrimenti None."""
+    cartella = cartella or ARTEFATTI_DIR
+    if not cartella or firma["hwm"] is None:
+        return None
+    try:
+        with open(os.path.join(cartella, ARTEFATTI_MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (manifest.get("formato"), manifest.get("hwm"), manifest.get("righe")) != (ARTEFATTI_FORMATO, firma["hwm"], firma["righe"]):
+        return None
+    return manifest
+
+def pivot_precalcolato(scheda, firma):
+    manifest = manifest_artefatti(firma)
+    voce = manifest["schede"].get(scheda) if manifest else None
+    if not voce:
+        return None
+    try:
+        return leggi_pivot(os.path.join(ARTEFATTI_DIR, voce["pivot"]))
+    except (OSError, ValueError, KeyError, pa.ArrowException):
+        return None  # sostituito da una ricostruzione nel frattempo: si ricalcola
+
+def html_precalcolato(scheda, intervallo, mostra_tutto, firma):
+    manifest = manifest_artefatti(firma)
+    oggi = pd.Timestamp.today().normalize()  # come i renderer: anche dal refresher, che gira da giorni
+    # le pagine dipendono anche da oggi (today-col) e dalla modalità di render
+    if not manifest or (manifest["oggi"], manifest["modalita"]) != (f"{oggi:%Y-%m-%d}", MODALITA_GANTT):
+        return None
+    cercata = (f"{intervallo[0]:%Y-%m-%d}", f"{intervallo[1]:%Y-%m-%d}", mostra_tutto)
+    for pagina in manifest["schede"].get(scheda, {}).get("html", []):
+        if (pagina["inizio"], pagina["fine"], pagina["mostra_tutto"]) == cercata:
+            try:
+                with open(os.path.join(ARTEFATTI_DIR, pagina["file"]), encoding="utf-8") as f:
+                    return f.read()
+            except OSError:
+                return None
+    return None
+
+def scrivi_artefatti(cartella, df, inizio, firma, mostra_tutto=False):
+    """
+    Scrive in cartella pivot e pagine di default delle schede (più i blocchi di "Mostra tutto" se
+    richiesto); il manifest, sostituito per ultimo e in modo atomico, rende visibile il nuovo insieme.
+    """
+    versione = f"precalcolo:{firma['hwm']}"
+    colori = tabella_colori(versione, df)
+    orizzonte = orizzonte_date(df, oggi)
+    timbro = pd.Timestamp.now(tz="UTC").strftime("%Y%m%d%H%M%S")
+    os.makedirs(cartella, exist_ok=True)
+
+    schede = {}
+    for scheda in GRIGLIE_VIRTUALI:
+        base = f"{file_scheda(scheda)}-{timbro}"
+        salva_pivot(pivot_scheda(scheda, versione, df, inizio, colori), os.path.join(cartella, base + ".parquet"))
+        pagine = []
+        viste = viste_default(scheda, orizzonte, oggi) + (viste_mostra_tutto(scheda, orizzonte) if mostra_tutto else [])
+        for intervallo, tutto in viste:
+            nome = f"{base}{f'-tutto-{intervallo[0]:%Y%m%d}' if tutto else ''}.html"
+            with open(os.path.join(cartella, nome), "w", encoding="utf-8") as f:
+                f.write(html_scheda(scheda, intervallo, tutto, df, versione, inizio, colori))
+            pagine.append({"inizio": f"{intervallo[0]:%Y-%m-%d}", "fine": f"{intervallo[1]:%Y-%m-%d}",
+                           "mostra_tutto": tutto, "file": nome})
+        schede[scheda] = {"pivot": base + ".parquet", "html": pagine}
+
+    manifest = {
+        "formato": ARTEFATTI_FORMATO,
+        "creato": pd.Timestamp.now(tz="UTC").isoformat(),
+        "hwm": firma["hwm"],
+        "righe": firma["righe"],
+        "oggi": f"{oggi:%Y-%m-%d}",
+        "modalita": MODALITA_GANTT,
+        "schede": schede,
+    }
+    tmp = os.path.join(cartella, ARTEFATTI_MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(cartella, ARTEFATTI_MANIFEST))
+
+    usati = {v["pivot"] for v in schede.values()} | {p["file"] for v in schede.values() for p in v["html"]}
+    for nome in os.listdir(cartella):
+        # anche i .pkl del formato 1, che l'app non legge più
+        if nome.endswith((".parquet", ".pkl", ".html")) and nome not in usati:
+            os.remove(os.path.join(cartella, nome))
+    return manifest
+
+# --- Navigazione a finestre per i Gantt (solo la finestra richiesta viene renderizzata) ---
+DURATA_FINESTRA = FINESTRA_GIORNI_PRIMA + FINESTRA_GIORNI_DOPO + 1
+
+def inizio_finestra(scheda):
+    return st.session_state.get(f"finestra_{scheda}", finestra_iniziale(oggi)[0])
+
+def sposta_finestra(scheda, passi):
+    st.session_state[f"finestra_{scheda}"] = inizio_finestra(scheda) + pd.Timedelta(days=passi * DURATA_FINESTRA)
+
+def vai_a_data(scheda):
+    # la data scelta prende il posto di "oggi" nella finestra
+    data = st.session_state[f"vai_data_{scheda}"]
+    if data is None:
+        return
+    st.session_state[f"finestra_{scheda}"] = pd.Timestamp(data) - pd.Timedelta(days=FINESTRA_GIORNI_PRIMA)
+
+def torna_a_oggi(scheda):
+    st.session_state.pop(f"finestra_{scheda}", None)
+
+def controlli_finestra(scheda, orizzonte):
+    """Pulsanti periodo precedente/successivo e salto a data; restituisce (inizio, fine) visibili."""
+    inizio = inizio_finestra(scheda)
+    fine = inizio + pd.Timedelta(days=DURATA_FINESTRA - 1)
+    c1, c2, c3, c4, c5 = st.columns([1, 1, 1, 2, 3])
+    with c1:
+        st.button("◀ Periodo precedente", key=f"prec_{scheda}", on_click=sposta_finestra,
+                  args=(scheda, -1), disabled=inizio <= orizzonte[0])
+    with c2:
+        st.button("Oggi", key=f"oggi_{scheda}", on_click=torna_a_oggi, args=(scheda,))
+    with c3:
+        st.button("Periodo successivo ▶", key=f"succ_{scheda}", on_click=sposta_finestra,
+                  args=(scheda, 1), disabled=fine >= orizzonte[1])
+    with c4:
+        st.date_input("Vai alla data", value=None, key=f"vai_data_{scheda}", format="DD/MM/YYYY",
+                      on_change=vai_a_data, args=(scheda,), label_visibility="collapsed")
+    with c5:
+        st.caption(f"Dal {inizio:%d/%m/%y} al {fine:%d/%m/%y}")
+    return inizio, fine
+
+def sposta_blocco(scheda, blocco):
+    st.session_state[f"blocco_{scheda}"] = blocco
+
+def controlli_blocchi(scheda, orizzonte):
+    """Pulsanti blocco precedente/successivo di "Mostra tutto"; restituisce (inizio, fine) del blocco."""
+    blocchi = blocchi_orizzonte(orizzonte)
+    # l'orizzonte può accorciarsi con i dati: il blocco scelto resta nei limiti
+    blocco = min(st.session_state.get(f"blocco_{scheda}", blocco_di_oggi(blocchi, oggi)), len(blocchi) - 1)
+    inizio, fine = blocchi[blocco]
+    c1, c2, c3, c4 = st.columns([1, 1, 1, 5])
+    with c1:
+        st.button("◀ Blocco precedente", key=f"blocco_prec_{scheda}", on_click=sposta_blocco,
+                  args=(scheda, blocco - 1), disabled=blocco == 0)
+    with c2:
+        st.button("Oggi", key=f"blocco_oggi_{scheda}", on_click=sposta_blocco,
+                  args=(scheda, blocco_di_oggi(blocchi, oggi)))
+    with c3:
+        st.button("Blocco successivo ▶", key=f"blocco_succ_{scheda}", on_click=sposta_blocco,
+                  args=(scheda, blocco + 1), disabled=blocco == len(blocchi) - 1)
+    with c4:
+        st.caption(f"Blocco {blocco + 1} di {len(blocchi)}: dal {inizio:%d/%m/%y} al {fine:%d/%m/%y}")
+    return inizio, fine
+
+def valori_distinti(serie):
+    # i nulli resi testo ("None", "nan") non sono opzioni: ilike *None* non trova i NULL SQL
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # dai codici presenti: niente stringhe per riga
+        codici = np.unique(serie.cat.codes.to_numpy())
+        valori = serie.cat.categories.take(codici[codici >= 0])
+    else:
+        valori = serie.dropna().unique()
+    return sorted({str(v) for v in valori if str(v).strip() not in VALORI_VUOTI})
+
+@cache_scope("pivot")
+def opzioni_filtri(versione, _df):
+    # valori selezionabili nei filtri, una volta per versione dei dati
+    return {
+        "Pista": valori_distinti(_df["Pista"]),
+        "TE": valori_distinti(tabella_te(versione, _df)["TE"]),
+        "Progetto": sorted({p[:LUNGHEZZA_PREFISSO] for p in valori_distinti(_df["ID_Progetto"])}),
+        "Stato": valori_distinti(_df["Stato"]),
+    }
 
+def controlli_filtri(df, versione):
+    """
+    Filtri della sessione sui dati completi (le opzioni vengono da df); restituisce una
+    tupla ordinata ((nome, valori), ...), vuota senza filtri, usabile come chiave di cache.
+    """
+    opzioni = opzioni_filtri(versione, df)
+    with st.expander("Filtri"):
+        c1, c2, c3, c4, c5 = st.columns(5)
+        with c1:
+            periodo = st.date_input("Periodo", value=(), format="DD/MM/YYYY", key="filtro_periodo")
+        with c2:
+            piste = st.multiselect("Pista", opzioni["Pista"], key="filtro_pista")
+        with c3:
+            te = st.multiselect("TE", opzioni["TE"], key="filtro_te")
+        with c4:
+            progetti = st.multiselect("Gruppo progetti", opzioni["Progetto"], key="filtro_progetto")
+        with c5:
+            stati = st.multiselect("Stato", opzioni["Stato"], key="filtro_stato")
+    filtri = {"Pista": piste, "TE": te, "Progetto": progetti, "Stato": stati}
+    if len(periodo) == 2:
+        filtri["periodo"] = [d.strftime("%Y-%m-%d") for d in periodo]
+    return tuple(sorted((nome, tuple(sorted(valori))) for nome, valori in filtri.items() if valori))
+
+SCHEDE_A_FINESTRA = ("Gantt Progetti", "Gantt Piste", "Gantt TE")
+SCHEDE_MOSTRA_TUTTO = ("Gantt Progetti", "Gantt Piste")
+
+# Parametri di ogni scheda Gantt: colonna indice, split, titolo, id, opzioni della griglia virtuale
+GRIGLIE_VIRTUALI = {
+    "Gantt Progetti": ("ID_Progetto", False, "Progetto", "tableProgetti", dict(separatori=True, ordina_oggi=True)),
+    "Gantt Piste": ("Pista", False, "Pista", "tablePiste", dict(larghezze=(120, 140, 15))),
+    "Gantt TE": ("TE", True, "Test Engineer", "tableTE", dict(ordina_oggi=True)),
+    "Riassunto Progetti": (None, False, "Progetto", "tableProgettiColorati",
+                           dict(separatori=True, colori=True, larghezze=(250, 20, 20))),
+}
 
+def viste_default(scheda, orizzonte, oggi):
+    """(intervallo, mostra_tutto) delle pagine che una sessione appena aperta chiede per la scheda."""
+    return [(finestra_iniziale(oggi), False)] if scheda in SCHEDE_A_FINESTRA else [(orizzonte, False)]
+
+def viste_mostra_tutto(scheda, orizzonte):
+    """(intervallo, True) di tutti i blocchi di "Mostra tutto" della scheda."""
+    return [(blocco, True) for blocco in blocchi_orizzonte(orizzonte)] if scheda in SCHEDE_MOSTRA_TUTTO else []
+
+def chiave_html(scheda, versione, intervallo, mostra_tutto, oggi):
+    return (scheda, versione, intervallo, oggi, MODALITA_GANTT, mostra_tutto)
+
+def html_scheda(scheda, intervallo, mostra_tutto, df, versione, inizio, colori):
+    """HTML della scheda per l'intervallo di date richiesto (chiamata solo sui miss della cache HTML)."""
+    if ARTEFATTI_DIR:
+        precalcolato = html_precalcolato(scheda, intervallo, mostra_tutto, firma_dati(versione, df))
+        if precalcolato is not None:
+            return precalcolato
+    index_col, split_comma, titolo, table_id, opzioni = GRIGLIE_VIRTUALI[scheda]
+    pivot = pivot_scheda(scheda, versione, df, inizio, colori)
+    indice = indice_tooltip(index_col, split_comma, versione, df) if index_col else None
+
+    if MODALITA_GANTT == "virtuale":
+        return render_griglia_virtuale(pivot, titolo, table_id, intervallo, _indice_tooltip=indice, **opzioni)
+    if mostra_tutto:
+        return render_pivot_completo(pivot, titolo, table_id, orizzonte=intervallo)
+    if scheda == "Gantt Progetti":
+        return render_html_table_grouped(pivot, titolo, table_id, df_source=df, index_col=index_col,
+                                         split_comma=split_comma, _indice_tooltip=indice, finestra=intervallo)
+    if scheda == "Gantt Piste":
+        return render_html_table_piste(
+            pivot_df=pivot,
+            table_id=table_id,
+            df_source=df,
+            split_comma=split_comma,
+            ordine_first_col=None,  # opzionale
+            _indice_tooltip=indice,
+            finestra=intervallo
+        )
+    if scheda == "Gantt TE":
+        return render_html_table(pivot, titolo, table_id, df_source=df, index_col=index_col,
+                                 split_comma=split_comma, _indice_tooltip=indice, finestra=intervallo)
+    return render_html_table_colored(pivot, titolo, table_id, orizzonte=intervallo)
 
+def preriscalda_viste(df, versione, modifica=None):
+    """
+    Eseguita dal refresher prima di pubblicare una nuova versione dei dati: costruisce
+    colori, pivot, indici dei tooltip e pagine di default con le stesse chiavi che il
+    primo rerun userà, così nessuna sessione attende la ricostruzione. Con modifica
+    (sync incrementale) pivot, tooltip e colori partono da quelli della versione precedente.
+    Non tocca lo stato di modulo: il rerun che ha avviato il thread può star costruendo
+    le viste della versione corrente nello stesso modulo.
+    """
+    oggi = pd.Timestamp.today().normalize()  # il thread può girare da giorni
+    # pubblicato insieme ai dati: il primo rerun della nuova versione lo trova già pronto
+    df, inizio = dati_preparati(df, versione)
+    if modifica is not None:
+        aggiorna_viste(df, versione, modifica, inizio)
+    colori = tabella_colori(versione, df)
+    orizzonte = orizzonte_date(df, oggi)
+    for scheda, (index_col, split_comma, *_) in GRIGLIE_VIRTUALI.items():
+        pivot_scheda(scheda, versione, df, inizio, colori)
+        if index_col:
+            indice_tooltip(index_col, split_comma, versione, df)
+        for intervallo, tutto in viste_default(scheda, orizzonte, oggi):
+            html_in_cache(chiave_html(scheda, versione, intervallo, tutto, oggi), oggi,
+                          lambda: html_scheda(scheda, intervallo, tutto, df, versione, inizio, colori))
+
+# --- Avvio dell'app ---
+if AVVIO_APP:
+    st.set_page_config(layout="wide")
+    inizio_rerun = time.perf_counter()
+    PROFILO_ATTIVO = leggi_config("GANTT_PROFILO", False) or st.query_params.get("profilo") in ("1", "true", "si")
+
+    # Carica le variabili da secrets di streamlite
+    SUPABASE_URL = st.secrets["SUPABASE_URL"]
+    SUPABASE_KEY = st.secrets["SUPABASE_KEY"]
+    supabase = client_supabase(SUPABASE_URL, SUPABASE_KEY)
+    configura_sync(colonne_sync_presenti(SUPABASE_URL, (SYNC_ID_COL, SYNC_TS_COL)))
+
+    df, versione_dati = dati_correnti()
+    df, inizio_progetto = dati_preparati(df, versione_dati)
+    orizzonte = orizzonte_date(df, oggi)
+    colori_progetto = tabella_colori(versione_dati, df)
+
+    # --- Riga comandi in alto: Aggiorna dati, seleziona scheda, Vai ad oggi ---
+    col1, col2 = st.columns([1, 3])
+
+    with col1:
+        if st.button("Aggiorna dati", key="aggiorna_dati"):
+            # stesso percorso del refresher: le altre sessioni continuano a leggere la versione corrente
+            with st.spinner("Aggiornamento dei dati..."):
+                sincronizza_dati(preriscalda=preriscalda_viste)
+            st.rerun() # ricarica tutta la pagina
+        stato = stato_sync()
+        if stato["avviso"]:
+            st.warning(stato["avviso"])
+        if stato["origine"] == "snapshot":
+            salvato = pd.Timestamp(stato["snapshot_salvato"]).tz_convert("Europe/Rome")
+            st.caption(f"Dati dallo snapshot del {salvato:%d/%m/%y %H:%M}, aggiornamento in corso")
+        elif stato["aggiornato"] is not None:
+            minuti = int((pd.Timestamp.now(tz="Europe/Rome") - stato["aggiornato"]).total_seconds() // 60)
+            eta = "meno di un minuto fa" if minuti < 1 else f"{minuti} min fa"
+            st.caption(f"Dati aggiornati {eta}" + (", aggiornamento in corso" if stato["sync_in_corso"] else ""))
+        with st.expander("Stato cache"):
+            registro = registro_cache()
+            st.caption(f"Versione dati: {stato['versione']}")
+            for scope, ttl in CACHE_TTL.items():
+                ricostruito = registro[scope]
+                eta = "mai" if ricostruito is None else f"{ricostruito:%d/%m %H:%M:%S}"
+                st.caption(f"{scope}: ultima ricostruzione {eta} (TTL {ttl // 60} min)")
+            html_cache = cache_html()
+            st.caption(f"Pagine HTML in cache: {len(html_cache['voci'])} "
+                       f"({html_cache['byte'] / 2**20:.1f}/{HTML_CACHE_MB} MB)")
+    with col2:
+        st.markdown("""
+            <style>
+            div[data-testid="stSelectbox"] > label {display:none;}
+            div[data-testid="stSelectbox"] {margin-top: -24px;}
+            </style>
+            """, unsafe_allow_html=True)
+    
+        scheda = st.selectbox(
+            "", 
+            ["Gantt Progetti", "Riassunto Progetti", "Gantt Piste", "Gantt TE", "Statistiche giornaliere"],
+            key="scheda_selezione"
+        )
 
+    # Filtri: le run che li soddisfano vengono scaricate con i predicati in query; il
+    # Riassunto resta sui dati completi
+    filtri = controlli_filtri(df, versione_dati)
+    df_vista, versione_vista = df, versione_dati
+    if filtri and scheda != "Riassunto Progetti":
+        with st.spinner("Caricamento delle run filtrate..."):
+            df_vista = dati_filtrati(filtri, versione_dati)
+        versione_vista = versione_filtrata(versione_dati, filtri)
+        orizzonte = orizzonte_date(df_vista, oggi)
+        st.caption(f"{len(df_vista)} run su {len(df)} corrispondono ai filtri")
+    elif filtri:
+        st.caption("Il Riassunto mostra sempre tutti i progetti, senza filtri")
+
+    # SCHEDE
+
+    # "Mostra tutto": la vista completa viene generata solo quando richiesta, al posto della
+    # finestra, e un blocco di giorni alla volta
+    mostra_tutto = scheda in SCHEDE_MOSTRA_TUTTO and st.toggle("Mostra tutto", key=f"tutto_{scheda}")
+    if mostra_tutto:
+        finestra = controlli_blocchi(scheda, orizzonte)
+    elif scheda in SCHEDE_A_FINESTRA:
+        finestra = controlli_finestra(scheda, orizzonte)
+
+    if df_vista.empty:
+        st.info("Nessuna run corrisponde ai filtri")
+
+    elif scheda in GRIGLIE_VIRTUALI:
+        # le viste a finestra usano la finestra (o il blocco di "Mostra tutto"), il Riassunto l'intero orizzonte
+        intervallo = finestra if scheda in SCHEDE_A_FINESTRA else orizzonte
+        chiave = chiave_html(scheda, versione_vista, intervallo, mostra_tutto, oggi)
+        from streamlit.components.v1 import html as components_html
+        components_html(
+            html_in_cache(chiave, oggi, lambda: html_scheda(scheda, intervallo, mostra_tutto, df_vista, versione_vista,
+                                                            inizio_progetto, colori_progetto)),
+            height=900, scrolling=True
+        )
 
+    elif scheda == "Statistiche giornaliere":
+        granularita = st.radio("Dettaglio", list(GRANULARITA), horizontal=True, key="granularita_statistiche")
+        stat = statistiche(granularita, versione_vista, df_vista)
+        if stat is None:
+            st.info("Nessuna run con data di svolgimento")
+        else:
+            grafici = grafici_statistiche(stat, granularita)
+            st.altair_chart(grafici["run"], width="stretch")
+            c1, c2 = st.columns(2)
+            with c1:
+                st.altair_chart(grafici["da_svolgere"], width="stretch")
+            with c2:
+                st.altair_chart(grafici["progetti"], width="stretch")
+            st.altair_chart(grafici["piste"], width="stretch")
+            st.altair_chart(grafici["te"], width="stretch")
+
+    # --- Profilo del rerun: pannello + una riga di log JSON ---
+    if PROFILO_ATTIVO:
+        totale = time.perf_counter() - inizio_rerun
+        riepilogo = riepilogo_profilo(raccogli_profilo())
+        with st.expander("Profilo tempi"):
+            st.caption(f"Rerun: {totale:.3f} s (incluse le misure del rerun precedente e dei sync in background)")
+            st.dataframe(riepilogo)
+        fasi = riepilogo.round({"secondi": 4}).reset_index()
+        log_profilo.info(json.dumps({
+            "evento": "profilo_rerun",
+            "scheda": scheda,
+            "versione_dati": versione_dati,
+            "totale_s": round(totale, 4),
+            "fasi": fasi.astype(object).where(fasi.notna(), None).to_dict("records"),
+        }))
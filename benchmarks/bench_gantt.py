@@ -0,0 +1,191 @@
+# Benchmark delle fasi del Gantt su dati sintetici.
+#
+#   python benchmarks/bench_gantt.py                          # 10k, 100k e 1M righe
+#   python benchmarks/bench_gantt.py --righe 10000 --output risultati.json
+#   python benchmarks/bench_gantt.py --righe 10000 --confronta base.json
+#
+# Ogni fase (pulizia stile load_data, assegnazioni TE, build_pivot*, tooltip, statistiche,
+# render_html_table*, aggiornamento incrementale) è misurata separatamente; per i render si riportano anche i byte di HTML
+# prodotti. Il risultato è un JSON (stdout o --output) con una riga per (righe, fase) da
+# confrontare tra versioni con --confronta; l'avanzamento e il confronto vanno su stderr.
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RADICE)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import Gantt_da_Access as gantt  # importato come modulo: nessuna connessione e nessuna UI
+from dati_sintetici import genera_run
+
+RIGHE_DEFAULT = [10_000, 100_000, 1_000_000]
+
+
+def misura(ripetizioni, funzione, *args, **kwargs):
+    """Tempo migliore su `ripetizioni` esecuzioni e risultato dell'ultima."""
+    migliore, risultato = None, None
+    for _ in range(ripetizioni):
+        inizio = time.perf_counter()
+        risultato = funzione(*args, **kwargs)
+        durata = time.perf_counter() - inizio
+        migliore = durata if migliore is None else min(migliore, durata)
+    return migliore, risultato
+
+
+def esegui(righe, ripetizioni, seed):
+    risultati = []
+
+    def registra(fase, funzione, *args, **kwargs):
+        secondi, risultato = misura(ripetizioni, funzione, *args, **kwargs)
+        byte_html = len(risultato.encode("utf-8")) if isinstance(risultato, str) else None
+        risultati.append({"righe": righe, "fase": fase, "secondi": round(secondi, 6), "byte_html": byte_html})
+        print(f"{righe:>9} {fase:<45} {secondi:9.3f} s" + (f" {byte_html:>12,} B" if byte_html else ""),
+              file=sys.stderr, flush=True)
+        return risultato
+
+    rows = genera_run(righe, seed=seed, oggi=gantt.oggi, colonne=gantt.COLONNE_RUN)
+
+    # --- pulizia come in load_data ---
+    grezzo = registra("pulizia.crea_frame", gantt.crea_frame, rows)
+    df = registra("pulizia.pulisci_dati", lambda: gantt.pulisci_dati(grezzo.copy()))
+    df, inizio_progetto = registra("pulizia.prepara_dati", gantt.prepara_dati, df)
+
+    colori = registra("colori.build_color_table", gantt.build_color_table, df["ID_Progetto"])
+    orizzonte = gantt.orizzonte_date(df, gantt.oggi)
+    finestra = gantt.finestra_iniziale(gantt.oggi)
+    blocchi = gantt.blocchi_orizzonte(orizzonte)
+    blocco = blocchi[gantt.blocco_di_oggi(blocchi, gantt.oggi)]  # "Mostra tutto" aperto su oggi
+
+    # --- pivot (ogni costruttore riceve una copia, come pivot_scheda) ---
+    assegnazioni = registra("assegnazioni_te", gantt.assegnazioni_te, df)
+    pivot_progetti = registra("build_pivot_progetti_solo_scenario",
+                              lambda: gantt.build_pivot_progetti_solo_scenario(df.copy()))
+    registra("build_pivot_piste", lambda: gantt.build_pivot_piste(df.copy()))
+    pivot_piste = registra("build_pivot[Pista]", lambda: gantt.build_pivot(df.copy(), "Pista", solo_id=True,
+                                                                          inizio=inizio_progetto, colori=colori))
+    pivot_te = registra("build_pivot[TE]",
+                        lambda: gantt.build_pivot(df.copy(), "TE", solo_id=True, split_comma=True,
+                                                  assegnazioni=assegnazioni, inizio=inizio_progetto, colori=colori))
+    pivot_colorati = registra("build_pivot_progetti_colorati", lambda: gantt.build_pivot_progetti_colorati(df.copy(), colori))
+
+    # --- tooltip ---
+    tip_progetti = registra("build_tooltip_index[ID_Progetto]", gantt.build_tooltip_index, df, "ID_Progetto")
+    tip_piste = registra("build_tooltip_index[Pista]", gantt.build_tooltip_index, df, "Pista")
+    tip_te = registra("build_tooltip_index[TE]", gantt.build_tooltip_index, df, "TE", True, assegnazioni)
+
+    # --- statistiche giornaliere ---
+    tabelle = registra("tabelle_giornaliere", gantt.tabelle_giornaliere, df, assegnazioni)
+    for granularita in gantt.GRANULARITA:
+        registra(f"aggrega_statistiche[{granularita}]", gantt.aggrega_statistiche, tabelle, granularita)
+
+    # --- render ---
+    registra("render_html_table_grouped", gantt.render_html_table_grouped, pivot_progetti, "Progetto",
+             "tableProgetti", df_source=df, index_col="ID_Progetto", _indice_tooltip=tip_progetti, finestra=finestra)
+    registra("render_html_table_piste", gantt.render_html_table_piste, pivot_piste, "tablePiste",
+             df_source=df, _indice_tooltip=tip_piste, finestra=finestra)
+    registra("render_html_table", gantt.render_html_table, pivot_te, "Test Engineer", "tableTE",
+             df_source=df, index_col="TE", split_comma=True, _indice_tooltip=tip_te, finestra=finestra)
+    registra("render_html_table_colored", gantt.render_html_table_colored, pivot_colorati, "Progetto",
+             "tableProgettiColorati", orizzonte=orizzonte)
+    registra("render_pivot_completo[Progetti]", gantt.render_pivot_completo, pivot_progetti, "Progetto",
+             "tableProgetti", orizzonte=blocco)
+    registra("render_griglia_virtuale[Progetti]", gantt.render_griglia_virtuale, pivot_progetti, "Progetto",
+             "tableProgetti", finestra, _indice_tooltip=tip_progetti, separatori=True, ordina_oggi=True)
+    registra("render_griglia_virtuale[TE]", gantt.render_griglia_virtuale, pivot_te, "Test Engineer",
+             "tableTE", finestra, _indice_tooltip=tip_te, ordina_oggi=True)
+
+    # --- aggiornamento incrementale: 10 run riprogrammate di qualche giorno ---
+    base = {"Gantt Progetti": pivot_progetti, "Gantt Piste": pivot_piste, "Gantt TE": pivot_te,
+            "Riassunto Progetti": pivot_colorati}
+    for scheda, pivot in base.items():
+        gantt.registra_vista(("pivot", scheda), "bench", pivot)
+    for (index_col, split_comma), indice in {("ID_Progetto", False): tip_progetti, ("Pista", False): tip_piste,
+                                             ("TE", True): tip_te}.items():
+        gantt.registra_vista(("tooltip", index_col, split_comma), "bench", indice)
+    gantt.registra_vista(("colori",), "bench", colori)
+    rng = np.random.default_rng(seed)
+    ids = rng.choice(df[gantt.SYNC_ID_COL].to_numpy(), min(10, len(df)), replace=False)
+    nuovo = df.copy()
+    spostate = nuovo[gantt.SYNC_ID_COL].isin(ids)
+    nuovo.loc[spostate, "Data_svolgimento"] += pd.to_timedelta(rng.integers(-3, 4, spostate.sum()), unit="D")
+    nuovo, inizio_nuovo = gantt.prepara_dati(nuovo)
+    registra("aggiorna_viste[10 run]", gantt.aggiorna_viste, nuovo, "bench+1",
+             {"da": "bench", "precedente": df, "ids": ids}, inizio_nuovo)
+    return risultati
+
+
+def commit_corrente():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RADICE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def confronta(risultati, percorso, soglia):
+    """Stampa il rapporto nuovo/vecchio per ogni (righe, fase) presente in entrambi i file."""
+    with open(percorso, encoding="utf-8") as f:
+        vecchio = json.load(f)
+    base = {(r["righe"], r["fase"]): r for r in vecchio["risultati"]}
+    peggiorate = 0
+    print(f"\nConfronto con {percorso} (commit {vecchio['meta'].get('commit')})", file=sys.stderr)
+    for r in risultati:
+        prima = base.get((r["righe"], r["fase"]))
+        if prima is None or not prima["secondi"]:
+            continue
+        rapporto = r["secondi"] / prima["secondi"]
+        segno = "  <-- più lento" if rapporto > soglia else ""
+        peggiorate += rapporto > soglia
+        print(f"{r['righe']:>9} {r['fase']:<45} {prima['secondi']:9.3f} -> {r['secondi']:9.3f} s  x{rapporto:.2f}{segno}",
+              file=sys.stderr)
+    return peggiorate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark delle fasi del Gantt su dati sintetici")
+    parser.add_argument("--righe", type=int, nargs="+", default=RIGHE_DEFAULT)
+    parser.add_argument("--ripetizioni", type=int, default=1, help="si tiene il tempo migliore")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="file JSON dei risultati (default: stdout)")
+    parser.add_argument("--confronta", help="JSON di un'esecuzione precedente da confrontare")
+    parser.add_argument("--soglia", type=float, default=1.2, help="rapporto oltre il quale una fase è più lenta")
+    args = parser.parse_args()
+
+    risultati = []
+    for righe in args.righe:
+        risultati += esegui(righe, args.ripetizioni, args.seed)
+
+    documento = {
+        "meta": {
+            "commit": commit_corrente(),
+            "data": pd.Timestamp.now(tz="Europe/Rome").isoformat(),
+            "oggi": gantt.oggi.strftime("%Y-%m-%d"),
+            "seed": args.seed,
+            "ripetizioni": args.ripetizioni,
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+        },
+        "risultati": risultati,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(documento, f, indent=2)
+    else:
+        print(json.dumps(documento, indent=2))
+
+    if args.confronta:
+        sys.exit(1 if confronta(risultati, args.confronta, args.soglia) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Generatore sintetico di tbl_run_progetti per i benchmark.
+#
+# Le righe hanno la stessa forma di quelle restituite da Supabase (lista di dict con
+# stringhe, date ISO e None) e distribuzioni simili ai dati reali: progetti con un
+# periodo di svolgimento, scenari di Setup(OR)/Setup(Pretest), piste con qualche
+# valore nullo, TE multipli separati da virgola, Turno nullo e stati misti.
+
+import numpy as np
+import pandas as pd
+
+CLIENTI = ["CSI", "IMQ", "FCA", "STL", "MSR", "BMW", "VWG", "REN", "TOY", "HYU"]
+SCENARI = ["Setup(OR)", "Setup(Pretest)", "Frontale", "Laterale", "Posteriore", "Pedone",
+           "Ribaltamento", "Sled", "Misura", "Verifica"]
+PESI_SCENARI = [0.06, 0.04, 0.2, 0.15, 0.1, 0.1, 0.05, 0.15, 0.1, 0.05]
+PISTE = ["PB1", "PB2", "PS", "Biella", None]
+PESI_PISTE = [0.3, 0.25, 0.2, 0.15, 0.1]
+TURNI = ["M", "P", "N", None]
+PESI_TURNI = [0.38, 0.34, 0.13, 0.15]
+STATI = ["Svolto", "Da svolgere", "Annullato"]
+PESI_STATI = [0.6, 0.32, 0.08]
+TE = ["Rossi", "Bianchi", "Verdi", "Neri", "Gialli", "Russo", "Ferrari", "Esposito", "Romano", "Colombo",
+      "Ricci", "Marino", "Greco", "Bruno", "Gallo", "Conti", "De Luca", "Mancini", "Costa", "Giordano",
+      "Rizzo", "Lombardi", "Moretti", "Barbieri", "Fontana", "Santoro", "Mariani", "Rinaldi", "Caruso", "Ferrara"]
+AL = [f"AL{i:02d}" for i in range(1, 21)]
+PIATTAFORME = [f"PF-{lettera}{i}" for lettera in "ABCDE" for i in range(1, 7)]
+
+
+def genera_run(righe, seed=0, oggi=None, colonne=None):
+    """
+    Restituisce `righe` run sintetiche come lista di dict (formato delle risposte Supabase).
+    Le date cadono in circa un anno attorno ad `oggi`; `colonne` limita i campi restituiti.
+    """
+    rng = np.random.default_rng(seed)
+    oggi = pd.Timestamp.today().normalize() if oggi is None else pd.Timestamp(oggi)
+
+    # progetti: circa 40 run ciascuno, con inizio e durata propri e popolarità non uniforme
+    n_progetti = max(20, righe // 40)
+    clienti = rng.choice(CLIENTI, n_progetti)
+    anni = rng.integers(23, 27, n_progetti)
+    progetti = np.array([f"{c}{a}-{k:04d}" for k, (c, a) in enumerate(zip(clienti, anni))], dtype=object)
+    inizio = rng.integers(-180, 180, n_progetti)
+    durata = rng.integers(3, 60, n_progetti)
+    peso = rng.pareto(1.5, n_progetti) + 1
+    p = rng.choice(n_progetti, righe, p=peso / peso.sum())
+
+    giorno = inizio[p] + (rng.random(righe) * durata[p]).astype(int)
+    date = (oggi + pd.to_timedelta(giorno, unit="D")).strftime("%Y-%m-%d").to_numpy(dtype=object)
+    date[rng.random(righe) < 0.02] = None
+
+    # 1-3 TE per run, separati da virgola (a volte senza spazio), il 5% senza TE
+    quanti = rng.choice([1, 2, 3], righe, p=[0.6, 0.3, 0.1])
+    nomi = rng.choice(TE, (righe, 3))
+    separatori = np.where(rng.random(righe) < 0.8, ", ", ",")
+    te = np.array([sep.join(n[:k]) for n, k, sep in zip(nomi, quanti, separatori)], dtype=object)
+    te[rng.random(righe) < 0.05] = None
+
+    al = rng.choice(np.array(AL + [None], dtype=object), righe)
+
+    frame = pd.DataFrame({
+        "id": np.arange(1, righe + 1),
+        "updated_at": (pd.Timestamp("2025-01-01", tz="UTC")
+                       + pd.to_timedelta(np.arange(righe), unit="s")).strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+        "ID_Progetto": progetti[p],
+        "Scenario": rng.choice(SCENARI, righe, p=PESI_SCENARI),
+        "Stato": rng.choice(np.array(STATI, dtype=object), righe, p=PESI_STATI),
+        "Pista": rng.choice(np.array(PISTE, dtype=object), righe, p=PESI_PISTE),
+        "TE": te,
+        "AL": al,
+        "Piattaforma": rng.choice(PIATTAFORME, righe),
+        "Turno": rng.choice(np.array(TURNI, dtype=object), righe, p=PESI_TURNI),
+        "Data_svolgimento": date,
+    })
+    if colonne is not None:
+        frame = frame[list(colonne)]
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
@@ -0,0 +1,65 @@
+# Precalcolo delle schede del Gantt fuori da Streamlit.
+#
+#   python precalcola.py --cartella artefatti                     # dallo snapshot locale (o da Supabase)
+#   python precalcola.py --cartella artefatti --sorgente supabase --mostra-tutto
+#
+# Legge le run dallo snapshot Parquet o da Supabase, costruisce i pivot e le pagine di
+# default delle quattro schede e li scrive in --cartella insieme a un manifest.json.
+# L'app, avviata con GANTT_ARTEFATTI_DIR=<cartella>, serve direttamente questi artefatti
+# quando provengono dagli stessi dati che ha caricato (stesso high-water mark e numero di
+# righe) e ricalcola da sé in tutti gli altri casi. Pensato per girare da cron, dopo ogni
+# aggiornamento dei dati e poco dopo mezzanotte (le pagine dipendono dal giorno corrente).
+
+import argparse
+import os
+import sys
+import time
+
+import Gantt_da_Access as gantt  # importato come modulo: nessuna UI
+
+
+def carica(sorgente, snapshot):
+    """DataFrame pulito delle run dalla sorgente richiesta."""
+    if snapshot:
+        gantt.SNAPSHOT_PATH = snapshot
+    if sorgente == "snapshot":
+        letto = gantt.leggi_snapshot()
+        if letto is None:
+            sys.exit(gantt.stato_sync().get("avviso") or f"Snapshot non trovato: {gantt.SNAPSHOT_PATH}")
+        return letto[0]
+
+    url = gantt.leggi_config("SUPABASE_URL", None)
+    gantt.supabase = gantt.client_supabase(url, gantt.leggi_config("SUPABASE_KEY", None))
+    gantt.configura_sync(gantt.colonne_sync_presenti(url, (gantt.SYNC_ID_COL, gantt.SYNC_TS_COL)))
+    return gantt.load_data()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precalcola pivot e pagine delle schede del Gantt")
+    parser.add_argument("--cartella", default=gantt.ARTEFATTI_DIR or "artefatti",
+                        help="cartella degli artefatti (default: GANTT_ARTEFATTI_DIR o ./artefatti)")
+    parser.add_argument("--sorgente", choices=["snapshot", "supabase"],
+                        help="default: snapshot se esiste, altrimenti supabase")
+    parser.add_argument("--snapshot", help="percorso dello snapshot Parquet (default: GANTT_SNAPSHOT_PATH)")
+    parser.add_argument("--mostra-tutto", action="store_true", help="scrive anche le pagine \"Mostra tutto\"")
+    args = parser.parse_args()
+
+    sorgente = args.sorgente or ("snapshot" if os.path.exists(args.snapshot or gantt.SNAPSHOT_PATH) else "supabase")
+    avvio = time.perf_counter()
+    df = carica(sorgente, args.snapshot)
+    # stessa firma che l'app calcola sui dati caricati (firma_dati)
+    hwm = gantt.calcola_hwm(df)
+    firma = {"hwm": hwm, "righe": len(df)}
+    if hwm is None:
+        # senza high-water mark l'app non può riconoscere gli artefatti come propri
+        print("Attenzione: dati senza high-water mark, l'app non userà questi artefatti", file=sys.stderr)
+
+    df, inizio = gantt.prepara_dati(df)
+    manifest = gantt.scrivi_artefatti(args.cartella, df, inizio, firma, mostra_tutto=args.mostra_tutto)
+    pagine = sum(len(voce["html"]) for voce in manifest["schede"].values())
+    print(f"{len(df)} righe da {sorgente} (hwm {hwm}): {len(manifest['schede'])} pivot e {pagine} pagine "
+          f"in {args.cartella} ({time.perf_counter() - avvio:.1f} s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()